@@ -1,4 +1,5 @@
 import logging
+import os
 import uvicorn
 
 # Configure logging
@@ -8,12 +9,24 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+HOST = "0.0.0.0"
+PORT = 8000
+# "development" runs one reloading process; "production" runs the pre-fork server.
+SERVER_MODE = os.getenv("SERVER_MODE", "development")
+
 def main():
+    if SERVER_MODE == "production":
+        from src.server import serve, worker_count
+
+        logger.info("Starting backend with pre-forked Uvicorn workers...")
+        serve(HOST, PORT, worker_count())
+        return
+
     logger.info("Starting backend with Uvicorn...")
     uvicorn.run(
         "src.main:app",
-        host="0.0.0.0",
-        port=8000,
+        host=HOST,
+        port=PORT,
         reload=True,
         log_level="info"
     )
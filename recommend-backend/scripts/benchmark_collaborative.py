@@ -0,0 +1,120 @@
+"""
+Compare client-side and server-side collaborative recommendations on a local mongod.
+
+Generates a synthetic playlist collection with a skewed track popularity,
+then times `recommend_collaborative` in both modes on the same seed sets.
+
+Usage (from recommend-backend/):
+    python -m scripts.benchmark_collaborative --playlists 200000 --queries 200
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+from typing import Dict, List
+
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from src.recommend.collaborative.recommend import recommend_collaborative
+
+logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)s] %(message)s")
+logger = logging.getLogger("benchmark_collaborative")
+logger.setLevel(logging.INFO)
+
+BATCH_SIZE = 5000
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default=os.getenv("BENCHMARK_MONGO_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default="spotify_benchmark")
+    parser.add_argument("--playlists", type=int, default=100_000)
+    parser.add_argument("--tracks", type=int, default=200_000)
+    parser.add_argument("--playlist-length", type=int, default=100, help="Mean playlist length")
+    parser.add_argument("--seeds", type=int, default=5, help="Seed tracks per query")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--max-neighbors", type=int, default=50)
+    parser.add_argument("--skip-load", action="store_true", help="Reuse an already generated collection")
+    return parser.parse_args()
+
+
+def track_uri(track_id: int) -> str:
+    return f"spotify:track:{track_id:022d}"
+
+
+async def generate_data(client: AsyncIOMotorClient, args: argparse.Namespace) -> None:
+    db = client[args.db_name]
+    await db.playlists.drop()
+
+    rng = np.random.default_rng(42)
+    logger.info(f"Generating {args.playlists} playlists over {args.tracks} tracks...")
+    batch = []
+    for i in range(args.playlists):
+        length = max(1, int(rng.poisson(args.playlist_length)))
+        track_ids = (rng.zipf(1.3, size=length) - 1) % args.tracks
+        batch.append({"name": f"playlist {i}", "tracks": [track_uri(t) for t in track_ids]})
+        if len(batch) >= BATCH_SIZE:
+            await db.playlists.insert_many(batch)
+            batch = []
+    if batch:
+        await db.playlists.insert_many(batch)
+
+    await db.playlists.create_index("tracks")
+    logger.info("Data generated.")
+
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    ordered = sorted(timings)
+    return {
+        "mean": statistics.fmean(ordered) * 1000,
+        "p50": ordered[len(ordered) // 2] * 1000,
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "max": ordered[-1] * 1000,
+    }
+
+
+async def run(args: argparse.Namespace) -> None:
+    client = AsyncIOMotorClient(args.mongo_uri)
+    if not args.skip_load:
+        await generate_data(client, args)
+
+    rng = np.random.default_rng(7)
+    seed_sets = [
+        [track_uri(int(t)) for t in (rng.zipf(1.3, size=args.seeds) - 1) % args.tracks]
+        for _ in range(args.queries)
+    ]
+
+    results = {}
+    for mode, server_side in (("client-side", False), ("server-side", True)):
+        # Warm up the connection pool and the working set before timing.
+        await recommend_collaborative(client, seed_sets[0], args.k, args.max_neighbors, args.db_name, server_side)
+
+        timings = []
+        outputs = []
+        for seeds in seed_sets:
+            start = time.perf_counter()
+            outputs.append(await recommend_collaborative(
+                client, seeds, args.k, args.max_neighbors, args.db_name, server_side))
+            timings.append(time.perf_counter() - start)
+        results[mode] = (summarize(timings), outputs)
+
+    overlaps = [
+        len(set(a) & set(b)) / max(1, len(a))
+        for a, b in zip(results["client-side"][1], results["server-side"][1])
+    ]
+
+    print(f"\n{'mode':<12} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for mode, (stats, _) in results.items():
+        print(f"{mode:<12} {stats['mean']:>9.2f} {stats['p50']:>9.2f} {stats['p95']:>9.2f} {stats['max']:>9.2f}")
+    print(f"\nMean top-{args.k} overlap between modes: {statistics.fmean(overlaps):.3f} "
+          "(ties in counts may be broken differently)")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
@@ -0,0 +1,146 @@
+"""
+Report recall versus latency of the pgvector ANN index against exact search.
+
+Vectorizes a sample of playlist names from the `playlists` table, computes the
+exact nearest neighbours with index scans disabled, then times the indexed
+query for each `hnsw.ef_search` (or `ivfflat.probes`) value. A returned
+playlist counts as a hit when it is no farther than the exact n-th neighbour,
+so ties between identical names do not count as misses.
+
+Usage (from recommend-backend/):
+    python -m scripts.report_pgvector_recall --queries 200 --ef-search 10,20,40,80,160
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+from sqlalchemy import func, select, text
+
+from scripts.benchmark_collaborative import summarize
+from src.recommend.clustering.config import settings
+from src.recommend.clustering.engine import AsyncSessionLocal, async_engine
+from src.recommend.clustering.models import Embedding, Playlist, to_embedding
+from src.recommend.clustering.recommend import set_search_params
+from src.recommend.clustering.tfidf import load_scorer
+
+logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)s] %(message)s")
+logger = logging.getLogger("report_pgvector_recall")
+logger.setLevel(logging.INFO)
+
+DISTANCE_TOLERANCE = 1e-6
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--n-neighbors", type=int, default=5)
+    parser.add_argument("--ef-search", default="10,20,40,80,160", help="Comma-separated hnsw.ef_search values")
+    parser.add_argument("--probes", default="1,2,5,10,20", help="Comma-separated ivfflat.probes values")
+    return parser.parse_args()
+
+
+async def index_type() -> str:
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            text("SELECT indexdef FROM pg_indexes WHERE tablename = 'playlists'"))
+        definitions = " ".join(row[0].lower() for row in result)
+    for name in ("hnsw", "ivfflat"):
+        if f"using {name}" in definitions:
+            return name
+    return "none"
+
+
+async def sample_query_vectors(n: int) -> List[Embedding]:
+    vectorizer = load_scorer(settings.tfidf_path, settings.tokenizer_path)
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(Playlist.name).order_by(func.random()).limit(n))
+        names = [row[0] for row in result]
+    return [to_embedding(vectorizer.transform(name)) for name in names]
+
+
+async def search(
+    query_vec: Embedding,
+    n_neighbors: int,
+    exact: bool = False,
+    ef_search: int = 0,
+    probes: int = 0
+) -> Tuple[List[float], float]:
+    """Distances of the nearest playlists and the query time in seconds."""
+    distance = Playlist.embedding.l2_distance(query_vec)
+    async with AsyncSessionLocal() as session:
+        if exact:
+            await session.execute(text("SET LOCAL enable_indexscan = off"))
+        await set_search_params(session, n_neighbors, ef_search, probes)
+        start = time.perf_counter()
+        result = await session.execute(select(distance).order_by(distance).limit(n_neighbors))
+        distances = [row[0] for row in result]
+        elapsed = time.perf_counter() - start
+    return distances, elapsed
+
+
+def recall(exact: List[float], approximate: List[float]) -> float:
+    if not exact:
+        return 1.0
+    radius = exact[-1] + DISTANCE_TOLERANCE
+    return min(len(exact), sum(1 for d in approximate if d <= radius)) / len(exact)
+
+
+async def measure(
+    query_vecs: List[Embedding],
+    truth: List[List[float]],
+    n_neighbors: int,
+    **params: int
+) -> Tuple[Dict[str, float], float]:
+    # Warm up the connection pool and the index pages before timing.
+    await search(query_vecs[0], n_neighbors, **params)
+
+    timings, recalls = [], []
+    for query_vec, exact in zip(query_vecs, truth):
+        distances, elapsed = await search(query_vec, n_neighbors, **params)
+        timings.append(elapsed)
+        recalls.append(recall(exact, distances))
+    return summarize(timings), statistics.fmean(recalls)
+
+
+def print_row(label: str, stats: Dict[str, float], mean_recall: float) -> None:
+    print(f"{label:<18} {mean_recall:>8.3f} {stats['mean']:>9.2f} {stats['p50']:>9.2f} "
+          f"{stats['p95']:>9.2f} {stats['max']:>9.2f}")
+
+
+async def run(args: argparse.Namespace) -> None:
+    kind = await index_type()
+    logger.info(f"Index on playlists.embedding: {kind}")
+
+    query_vecs = await sample_query_vectors(args.queries)
+    logger.info(f"Computing exact neighbours for {len(query_vecs)} queries...")
+    await search(query_vecs[0], args.n_neighbors, exact=True)
+    truth, timings = [], []
+    for query_vec in query_vecs:
+        distances, elapsed = await search(query_vec, args.n_neighbors, exact=True)
+        truth.append(distances)
+        timings.append(elapsed)
+    exact_stats = summarize(timings)
+
+    print(f"\n{'search':<18} {'recall':>8} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    print_row("exact", exact_stats, 1.0)
+
+    if kind == "hnsw":
+        sweep = [("ef_search", int(v)) for v in args.ef_search.split(",")]
+    elif kind == "ivfflat":
+        sweep = [("probes", int(v)) for v in args.probes.split(",")]
+    else:
+        sweep = []
+        print("\nNo ANN index on playlists.embedding; only exact search was measured.")
+
+    for param, value in sweep:
+        stats, mean_recall = await measure(query_vecs, truth, args.n_neighbors, **{param: value})
+        print_row(f"{param}={value}", stats, mean_recall)
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
@@ -1,13 +1,46 @@
+from contextlib import asynccontextmanager
+import asyncio
+
 from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 import os
 
+from src.recommend.clustering.config import settings as clustering_settings
+from src.recommend.collaborative.config import settings as collaborative_settings
+from src.recommend.config import settings as recommend_settings
+from src.recommend.connections import pool_stats
+from src.recommend.metrics import (MetricsMiddleware, register_routes,
+                                   register_services, render_metrics,
+                                   unregister_services)
 from src.recommend.router import router as recommend_router
+from src.recommend.services import RecommendServices
+from src.recommend.tracing import JsonlSpanExporter, TracingMiddleware
 
 frontend_url = os.getenv("FRONTEND_URL", "http://127.0.0.1:5173")
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Built on the server's event loop; warm-up runs in the background so
+    # /health answers at once while /ready waits for warm caches and pools.
+    services = RecommendServices(recommend_settings, clustering_settings, collaborative_settings)
+    app.state.services = services
+    register_routes(app)
+    register_services(services)
+    warm_up = None
+    if recommend_settings.warmup_enabled:
+        warm_up = asyncio.create_task(services.warm_up())
+    else:
+        services.ready = True
+    yield
+    if warm_up is not None:
+        warm_up.cancel()
+    unregister_services()
+    await services.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # app.include_router(auth_router)
 app.include_router(recommend_router)
@@ -26,8 +59,36 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if recommend_settings.tracing_enabled:
+    app.add_middleware(
+        TracingMiddleware,
+        exporter=JsonlSpanExporter(recommend_settings.tracing_jsonl_path)
+        if recommend_settings.tracing_jsonl_path else None,
+    )
+app.add_middleware(MetricsMiddleware)
 
 
 @app.get("/health", tags=["System"])
 async def health_check():
     return JSONResponse(content={"status": "ok"})
+
+
+@app.get("/ready", tags=["System"])
+async def readiness_check():
+    services = getattr(app.state, "services", None)
+    if services is None or not services.ready:
+        return JSONResponse(status_code=503, content={"status": "warming up"})
+    return JSONResponse(content={"status": "ready"})
+
+
+@app.get("/pools", tags=["System"])
+async def connection_pools():
+    """In-use and waiting connections and checkout latency of the Postgres and MongoDB pools."""
+    return JSONResponse(content=pool_stats())
+
+
+@app.get("/metrics", tags=["System"])
+async def metrics():
+    """Prometheus metrics: request, stage and result-size histograms, caches and connection pools."""
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
@@ -0,0 +1,28 @@
+import logging
+from typing import Any, Callable, Dict, Hashable, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_artifacts: Dict[Tuple[Callable, Tuple[Hashable, ...]], Any] = {}
+
+
+def load_artifact(loader: Callable[..., T], *args: Hashable) -> T:
+    """
+    Load a read-only artifact once per process and return the same object on
+    every later call with the same loader and arguments.
+
+    The pre-fork server (`src/server.py`) builds the services once in the
+    parent before forking, so the workers find their vectorizer, dictionary
+    and indexes here and share those pages copy-on-write instead of each
+    loading a private copy. Callers must not mutate what they get back.
+    """
+    key = (loader, args)
+    if key not in _artifacts:
+        _artifacts[key] = loader(*args)
+    return _artifacts[key]
+
+
+def loaded_artifacts() -> int:
+    return len(_artifacts)
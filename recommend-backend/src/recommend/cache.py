@@ -0,0 +1,204 @@
+import logging
+import re
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+from src.recommend.config import Settings
+from src.recommend.shared_cache import SharedCacheBackend, shared_key
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_playlist_name(playlist_name: str, lowercase: bool = True) -> str:
+    """
+    Collapse whitespace, and lower-case for a lower-casing vectorizer, so
+    trivially different names share an entry.
+    """
+    playlist_name = re.sub(r"\s+", " ", playlist_name).strip()
+    return playlist_name.lower() if lowercase else playlist_name
+
+
+def collaborative_key(query_uris: List[str], k: int) -> Tuple:
+    """Canonical key for a collaborative request: the seed set, not the seed order."""
+    return ("collaborative", tuple(sorted(set(query_uris))), k)
+
+
+def clustering_key(playlist_name: str, k: int, n_neighbors: int, lowercase: bool = True) -> Tuple:
+    return ("clustering", normalize_playlist_name(playlist_name, lowercase), k, n_neighbors)
+
+
+def estimate_size(key: Tuple, value: List[str]) -> int:
+    """Approximate the memory held by an entry: the key, the list and its strings."""
+    size = sys.getsizeof(value) + sum(sys.getsizeof(item) for item in value)
+    for part in key:
+        size += sys.getsizeof(part)
+        if isinstance(part, tuple):
+            size += sum(sys.getsizeof(item) for item in part)
+    return size
+
+
+@dataclass
+class _Entry:
+    value: Tuple[str, ...]
+    size: int
+    expires_at: float
+
+
+class ResultCache:
+    """In-process recommendation cache with a TTL and LRU eviction by byte budget."""
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "ResultCache":
+        return cls(
+            max_bytes=settings.result_cache_max_bytes,
+            ttl_seconds=settings.result_cache_ttl_seconds,
+        )
+
+    def get(self, key: Hashable) -> Optional[List[str]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return list(entry.value)
+
+    def set(self, key: Hashable, value: List[str]) -> None:
+        size = estimate_size(key, value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _Entry(
+            value=tuple(value),
+            size=size,
+            expires_at=time.monotonic() + self.ttl_seconds,
+        )
+        self.size_bytes += size
+        while self.size_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+        }
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self.size_bytes -= entry.size
+
+
+class TieredCache:
+    """
+    The cache the recommend services talk to: an in-process `ResultCache`
+    backed by an optional shared tier common to all workers.
+
+    Both tiers use the same keys; in the shared tier they are prefixed with
+    the dataset version, so workers serving another dataset never read
+    them. Shared-tier hits are copied into the local tier; shared-tier errors
+    are logged and treated as misses so a cache outage never fails a request.
+    """
+
+    def __init__(
+        self,
+        local: ResultCache,
+        shared: Optional[SharedCacheBackend] = None,
+        namespace: str = "recommend",
+        version: str = "1"
+    ):
+        self.local = local
+        self.shared = shared
+        self.namespace = namespace
+        self.version = version
+        self.shared_hits = 0
+        self.shared_misses = 0
+        self.shared_errors = 0
+
+    async def get(self, key: Hashable) -> Optional[List[str]]:
+        return (await self.get_many([key]))[0]
+
+    async def set(self, key: Hashable, value: List[str]) -> None:
+        await self.set_many({key: value})
+
+    async def get_many(self, keys: Sequence[Hashable]) -> List[Optional[List[str]]]:
+        results = [self.local.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if not missing or self.shared is None:
+            return results
+
+        try:
+            values = await self.shared.get_many([self._shared_key(keys[i]) for i in missing])
+        except Exception as e:
+            logger.warning(f"Shared cache lookup failed: {e}")
+            self.shared_errors += 1
+            return results
+
+        for i, value in zip(missing, values):
+            if value is None:
+                self.shared_misses += 1
+                continue
+            self.shared_hits += 1
+            self.local.set(keys[i], value)
+            results[i] = value
+        return results
+
+    async def set_many(self, items: Dict[Hashable, List[str]]) -> None:
+        for key, value in items.items():
+            self.local.set(key, value)
+        if self.shared is None:
+            return
+
+        try:
+            await self.shared.set_many(
+                {self._shared_key(key): value for key, value in items.items()},
+                self.local.ttl_seconds,
+            )
+        except Exception as e:
+            logger.warning(f"Shared cache write failed: {e}")
+            self.shared_errors += 1
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            **self.local.stats(),
+            "shared_hits": self.shared_hits,
+            "shared_misses": self.shared_misses,
+            "shared_errors": self.shared_errors,
+        }
+
+    async def close(self) -> None:
+        if self.shared is not None:
+            await self.shared.close()
+
+    def _shared_key(self, key: Hashable) -> str:
+        return shared_key(self.namespace, self.version, key)
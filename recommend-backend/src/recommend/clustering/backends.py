@@ -0,0 +1,444 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Union
+
+import asyncpg
+import numpy as np
+from qdrant_client import AsyncQdrantClient
+
+from src.recommend.artifacts import load_artifact
+from src.recommend.clustering.config import Settings
+from src.recommend.clustering.engine import (async_engine, create_asyncpg_pool,
+                                            warm_up_engine)
+from src.recommend.clustering.models import to_binary_embedding, to_embedding
+from src.recommend.clustering.recommend import (
+    collect_unique_tracks, merge_playlist_tracks, nearest_playlists,
+    nearest_playlists_asyncpg, recommend_clustering_server_side,
+    recommend_clustering_server_side_asyncpg, stream_nearest_playlists,
+    stream_nearest_playlists_asyncpg)
+from src.recommend.clustering.tfidf import QueryVector
+from src.recommend.dictionary import TrackRef
+from src.recommend.metrics import observe_stage
+
+logger = logging.getLogger(__name__)
+
+
+def playlist_tracks(tracks_indptr: np.ndarray, tracks: np.ndarray, i: int) -> List[int]:
+    """Tracks of playlist `i` from the CSR-form track lists of the NumPy artifacts."""
+    return tracks[tracks_indptr[i]:tracks_indptr[i + 1]].tolist()
+
+
+def nearest_first(positions: np.ndarray, distances: np.ndarray, n: int) -> np.ndarray:
+    """
+    The `n` positions with the smallest distances, nearest first. Ties are
+    broken by position so results are deterministic.
+
+    The in-process backends pass ||e||^2 - 2 e.q for an embedding (or
+    centroid) e and query q: the squared distance ||e - q||^2 without the
+    ||q||^2 term, which is the same for every candidate and so does not
+    change the ranking.
+    """
+    return positions[np.lexsort((positions, distances))[:n]]
+
+
+class VectorSearchBackend(ABC):
+    """Finds the playlists whose name embeddings are nearest to a query."""
+
+    # VECTOR_SEARCH_BACKEND value, used as the metrics label.
+    name = ""
+    # Whether the returned tracks are track dictionary ids rather than URIs.
+    returns_track_ids = False
+
+    @abstractmethod
+    async def search(self, query: QueryVector, n_neighbors: int) -> List[List[TrackRef]]:
+        """
+        Search the playlists nearest to a TF-IDF query.
+
+        Args:
+            query: TF-IDF vector of the playlist name.
+            n_neighbors: Number of playlists to return.
+
+        Returns:
+            Track lists of the nearest playlists, nearest first.
+        """
+
+    async def recommend(self, query: QueryVector, k: int, n_neighbors: int) -> List[TrackRef]:
+        """First `k` unique tracks of the `n_neighbors` nearest playlists."""
+        with observe_stage(self.name, "query"):
+            playlists = await self.search(query, n_neighbors)
+        with observe_stage(self.name, "merge"):
+            return merge_playlist_tracks(playlists, k)
+
+    async def stream(self, query: QueryVector, max_neighbors: int) -> AsyncIterator[List[TrackRef]]:
+        """Track lists of the nearest playlists, nearest first, for as long as the caller reads."""
+        for tracks in await self.search(query, max_neighbors):
+            yield tracks
+
+    async def recommend_adaptive(self, query: QueryVector, k: int, max_neighbors: int) -> List[TrackRef]:
+        """
+        First `k` unique tracks of the nearest playlists, reading neighbours in
+        increasing distance until `k` tracks are found or `max_neighbors` is hit.
+        Reading and merging interleave, so both count as the query stage.
+        """
+        with observe_stage(self.name, "query"):
+            return await collect_unique_tracks(self.stream(query, max_neighbors), k)
+
+    async def warm_up(self) -> None:
+        """Open the backend's connections ahead of the first query."""
+
+    async def close(self) -> None:
+        pass
+
+
+class PgvectorBackend(VectorSearchBackend):
+    """
+    Searches the `playlists` table through the SQLAlchemy ORM session
+    (`sqlalchemy` driver) or through prepared statements on a raw asyncpg
+    pool with binary vector encoding (`asyncpg` driver). With
+    `server_side_dedup` the tracks of the neighbours are expanded and
+    de-duplicated in Postgres and only `k` of them are returned.
+
+    Adaptive recommendations stream the neighbours through a server-side
+    cursor `stream_batch_size` rows at a time.
+    """
+
+    name = "pgvector"
+
+    def __init__(
+        self,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        returns_track_ids: bool = False,
+        driver: str = "sqlalchemy",
+        server_side_dedup: bool = False,
+        stream_batch_size: int = 5
+    ):
+        self.ef_search = ef_search
+        self.probes = probes
+        self.returns_track_ids = returns_track_ids
+        self.driver = driver
+        self.server_side_dedup = server_side_dedup
+        self.stream_batch_size = stream_batch_size
+        self._pool: Optional[asyncpg.Pool] = None
+        self._pool_lock = asyncio.Lock()
+
+    async def search(self, query: QueryVector, n_neighbors: int) -> List[List[TrackRef]]:
+        if self.driver == "asyncpg":
+            pool = await self._get_pool()
+            return await nearest_playlists_asyncpg(pool, to_binary_embedding(query), n_neighbors, self.ef_search)
+        return await nearest_playlists(to_embedding(query), n_neighbors, self.ef_search, self.probes)
+
+    async def recommend(self, query: QueryVector, k: int, n_neighbors: int) -> List[TrackRef]:
+        if not self.server_side_dedup:
+            return await super().recommend(query, k, n_neighbors)
+        with observe_stage(self.name, "query"):
+            if self.driver == "asyncpg":
+                pool = await self._get_pool()
+                return await recommend_clustering_server_side_asyncpg(
+                    pool, to_binary_embedding(query), k, n_neighbors, self.ef_search)
+            return await recommend_clustering_server_side(
+                to_embedding(query), k, n_neighbors, self.ef_search, self.probes)
+
+    async def stream(self, query: QueryVector, max_neighbors: int) -> AsyncIterator[List[TrackRef]]:
+        if self.driver == "asyncpg":
+            pool = await self._get_pool()
+            playlists = stream_nearest_playlists_asyncpg(
+                pool, to_binary_embedding(query), max_neighbors, self.ef_search, self.stream_batch_size)
+        else:
+            playlists = stream_nearest_playlists(
+                to_embedding(query), max_neighbors, self.ef_search, self.probes, self.stream_batch_size)
+        try:
+            async for tracks in playlists:
+                yield tracks
+        finally:
+            await playlists.aclose()
+
+    async def recommend_adaptive(self, query: QueryVector, k: int, max_neighbors: int) -> List[TrackRef]:
+        if self.server_side_dedup:
+            # The first `k` unique tracks of `max_neighbors` playlists are those of
+            # the shortest prefix holding `k`, so one statement gives the same result.
+            return await self.recommend(query, k, max_neighbors)
+        return await super().recommend_adaptive(query, k, max_neighbors)
+
+    async def warm_up(self) -> None:
+        if self.driver == "asyncpg":
+            pool = await self._get_pool()
+            logger.info(f"Opened asyncpg pool with {pool.get_size()} connections.")
+        else:
+            await warm_up_engine()
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+        await async_engine.dispose()
+
+    async def _get_pool(self) -> asyncpg.Pool:
+        if self._pool is None:
+            async with self._pool_lock:
+                if self._pool is None:
+                    self._pool = await create_asyncpg_pool(self._server_settings())
+        return self._pool
+
+    def _server_settings(self) -> Dict[str, str]:
+        server_settings = {}
+        if self.ef_search:
+            server_settings["hnsw.ef_search"] = str(self.ef_search)
+        if self.probes:
+            server_settings["ivfflat.probes"] = str(self.probes)
+        return server_settings
+
+
+class QdrantBackend(VectorSearchBackend):
+    """
+    Searches a Qdrant collection loaded by `load_data_clustering.py`, whose
+    points carry the playlist tracks in their payload.
+    """
+
+    name = "qdrant"
+
+    def __init__(self, url: str, collection: str, api_key: Optional[str] = None):
+        self.client = AsyncQdrantClient(url=url, api_key=api_key)
+        self.collection = collection
+
+    async def search(self, query: QueryVector, n_neighbors: int) -> List[List[TrackRef]]:
+        result = await self.client.query_points(
+            collection_name=self.collection,
+            query=query.dense().tolist(),
+            limit=n_neighbors,
+            with_payload=["tracks"],
+        )
+        logger.info(f"Retrieved {len(result.points)} similar playlists.")
+        return [point.payload.get("tracks", []) for point in result.points]
+
+    async def warm_up(self) -> None:
+        await self.client.get_collection(self.collection)
+
+    async def close(self) -> None:
+        await self.client.close()
+
+
+class NumpyBackend(VectorSearchBackend):
+    """
+    Exact L2 search over a memory-mapped playlist embedding matrix.
+
+    The matrix is stored column-major, so gathering the few columns a TF-IDF
+    query touches reads contiguous memory; the distances of every playlist
+    then come from one small matmul and the nearest from `argpartition`.
+    Playlist tracks are kept in CSR form: the tracks of playlist `i` are
+    `tracks[tracks_indptr[i]:tracks_indptr[i + 1]]`, as track dictionary ids.
+    """
+
+    name = "numpy"
+    returns_track_ids = True
+
+    def __init__(self, embeddings: np.ndarray, tracks_indptr: np.ndarray, tracks: np.ndarray):
+        self.embeddings = embeddings
+        self.tracks_indptr = tracks_indptr
+        self.tracks = tracks
+        self.squared_norms = self._squared_norms(embeddings)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "NumpyBackend":
+        path = Path(path)
+        backend = cls(
+            embeddings=np.load(path / "embeddings.npy", mmap_mode="r"),
+            tracks_indptr=np.load(path / "tracks_indptr.npy", mmap_mode="r"),
+            tracks=np.load(path / "tracks.npy", mmap_mode="r"),
+        )
+        logger.info(
+            f"Loaded {backend.embeddings.shape[0]} playlist embeddings "
+            f"({backend.embeddings.dtype}) from {path}.")
+        return backend
+
+    async def search(self, query: QueryVector, n_neighbors: int) -> List[List[TrackRef]]:
+        results = await asyncio.to_thread(self.search_batch, [query], n_neighbors)
+        logger.info(f"Retrieved {len(results[0])} similar playlists.")
+        return results[0]
+
+    def search_batch(self, queries: List[QueryVector], n_neighbors: int) -> List[List[List[TrackRef]]]:
+        """Nearest playlists of every query, with one matmul for the whole batch."""
+        columns = np.unique(np.concatenate([query.indices for query in queries]))
+        weights = np.zeros((len(queries), len(columns)), dtype=np.float32)
+        for row, query in zip(weights, queries):
+            row[np.searchsorted(columns, query.indices)] = query.data
+        dots = weights @ np.asarray(self.embeddings[:, columns], dtype=np.float32).T
+        distances = self.squared_norms[None, :] - 2 * dots
+
+        n = max(0, min(n_neighbors, distances.shape[1]))
+        if n == 0:
+            return [[] for _ in queries]
+
+        candidates = np.argpartition(distances, n - 1, axis=1)[:, :n]
+        results = []
+        for row, row_candidates in zip(distances, candidates):
+            nearest = nearest_first(row_candidates, row[row_candidates], n)
+            results.append([self._playlist_tracks(i) for i in nearest])
+        return results
+
+    def _playlist_tracks(self, i: int) -> List[int]:
+        return playlist_tracks(self.tracks_indptr, self.tracks, i)
+
+    @staticmethod
+    def _squared_norms(embeddings: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        norms = np.empty(embeddings.shape[0], dtype=np.float32)
+        for start in range(0, embeddings.shape[0], chunk_size):
+            chunk = np.asarray(embeddings[start:start + chunk_size], dtype=np.float32)
+            norms[start:start + chunk_size] = np.einsum("ij,ij->i", chunk, chunk)
+        return norms
+
+
+class PostingsBackend(VectorSearchBackend):
+    """
+    Exact L2 search over an inverted index from TF-IDF term to playlists.
+
+    Only playlists sharing a term with the query have a non-zero dot product,
+    so their distances come from the union of the query's few posting lists.
+    Every other playlist is at `||e||^2 + ||q||^2` from the query; the nearest
+    of those are taken in ascending norm order, which keeps the result exact
+    without scanning the catalogue. Distances match `NumpyBackend`, though
+    playlists with identical names may tie in a different order after float
+    rounding. Playlist tracks are stored as in `NumpyBackend`.
+    """
+
+    name = "postings"
+    returns_track_ids = True
+
+    def __init__(
+        self,
+        postings_indptr: np.ndarray,
+        postings: np.ndarray,
+        postings_weights: np.ndarray,
+        tracks_indptr: np.ndarray,
+        tracks: np.ndarray
+    ):
+        self.postings_indptr = postings_indptr
+        self.postings = postings
+        self.postings_weights = postings_weights
+        self.tracks_indptr = tracks_indptr
+        self.tracks = tracks
+        n_playlists = len(tracks_indptr) - 1
+        self.squared_norms = np.bincount(
+            postings, weights=np.square(postings_weights, dtype=np.float64), minlength=n_playlists
+        ).astype(np.float32)
+        self.norm_order = np.argsort(self.squared_norms, kind="stable")
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "PostingsBackend":
+        path = Path(path)
+        backend = cls(
+            postings_indptr=np.load(path / "postings_indptr.npy", mmap_mode="r"),
+            postings=np.load(path / "postings.npy", mmap_mode="r"),
+            postings_weights=np.load(path / "postings_weights.npy", mmap_mode="r"),
+            tracks_indptr=np.load(path / "tracks_indptr.npy", mmap_mode="r"),
+            tracks=np.load(path / "tracks.npy", mmap_mode="r"),
+        )
+        logger.info(
+            f"Loaded postings of {len(backend.postings_indptr) - 1} terms over "
+            f"{len(backend.squared_norms)} playlists from {path}.")
+        return backend
+
+    async def search(self, query: QueryVector, n_neighbors: int) -> List[List[TrackRef]]:
+        nearest = self.nearest(query, n_neighbors)
+        logger.info(f"Retrieved {len(nearest)} similar playlists.")
+        return [self._playlist_tracks(i) for i in nearest]
+
+    def nearest(self, query: QueryVector, n_neighbors: int) -> np.ndarray:
+        """Positions of the `n_neighbors` playlists nearest to the query, nearest first."""
+        n = max(0, min(n_neighbors, len(self.squared_norms)))
+        if n == 0:
+            return np.empty(0, dtype=np.int64)
+
+        starts = self.postings_indptr[query.indices]
+        ends = self.postings_indptr[query.indices + 1]
+        if query.nnz:
+            playlists = np.concatenate([self.postings[s:e] for s, e in zip(starts, ends)])
+            weights = np.concatenate([
+                self.postings_weights[s:e] * np.float32(value)
+                for s, e, value in zip(starts, ends, query.data)
+            ])
+        else:
+            playlists = np.empty(0, dtype=np.int32)
+            weights = np.empty(0, dtype=np.float32)
+        candidates, inverse = np.unique(playlists, return_inverse=True)
+        dots = np.bincount(inverse, weights=weights, minlength=len(candidates))
+        distances = self.squared_norms[candidates] - 2 * dots
+
+        # The nearest playlists without a shared term: smallest norms first.
+        others = self.norm_order[:n + len(candidates)]
+        others = others[~np.isin(others, candidates)][:n]
+
+        positions = np.concatenate([candidates, others])
+        distances = np.concatenate([distances, self.squared_norms[others]])
+        return nearest_first(positions, distances, n)
+
+    def _playlist_tracks(self, i: int) -> List[int]:
+        return playlist_tracks(self.tracks_indptr, self.tracks, i)
+
+
+class CentroidBackend(VectorSearchBackend):
+    """
+    Serves the offline KMeans clusters built by `prepare_playlist_clusters.py`.
+
+    A query is assigned to its nearest centroids (a few hundred dot products
+    over the query's non-zero terms) and each cluster's precomputed, ranked
+    and de-duplicated track list stands in for a playlist. The nearest
+    cluster alone usually holds `k` tracks; further clusters only pad short
+    lists. No database is involved.
+    """
+
+    name = "centroids"
+    returns_track_ids = True
+
+    def __init__(self, centroids: np.ndarray, tracks_indptr: np.ndarray, tracks: np.ndarray):
+        self.centroids = centroids
+        self.tracks_indptr = tracks_indptr
+        self.tracks = tracks
+        self.squared_norms = np.einsum("ij,ij->i", centroids, centroids)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "CentroidBackend":
+        path = Path(path)
+        backend = cls(
+            centroids=np.load(path / "centroids.npy"),
+            tracks_indptr=np.load(path / "tracks_indptr.npy", mmap_mode="r"),
+            tracks=np.load(path / "tracks.npy", mmap_mode="r"),
+        )
+        logger.info(f"Loaded {len(backend.centroids)} playlist clusters from {path}.")
+        return backend
+
+    async def search(self, query: QueryVector, n_neighbors: int) -> List[List[TrackRef]]:
+        nearest = self.nearest(query, n_neighbors)
+        logger.info(f"Assigned query to clusters {nearest.tolist()}.")
+        return [self._playlist_tracks(i) for i in nearest]
+
+    def nearest(self, query: QueryVector, n_clusters: int) -> np.ndarray:
+        """Indices of the `n_clusters` centroids nearest to the query, nearest first."""
+        n = max(0, min(n_clusters, len(self.centroids)))
+        if n == 0:
+            return np.empty(0, dtype=np.int64)
+        distances = self.squared_norms - 2 * (self.centroids[:, query.indices] @ query.data)
+        candidates = np.argpartition(distances, n - 1)[:n]
+        return nearest_first(candidates, distances[candidates], n)
+
+    def _playlist_tracks(self, i: int) -> List[int]:
+        return playlist_tracks(self.tracks_indptr, self.tracks, i)
+
+
+def build_vector_search_backend(settings: Settings) -> VectorSearchBackend:
+    if settings.vector_search_backend == "qdrant":
+        return QdrantBackend(settings.qdrant_url, settings.qdrant_collection, settings.qdrant_api_key)
+    if settings.vector_search_backend == "numpy":
+        return load_artifact(NumpyBackend.load, settings.playlist_embeddings_path)
+    if settings.vector_search_backend == "postings":
+        return load_artifact(PostingsBackend.load, settings.playlist_embeddings_path)
+    if settings.vector_search_backend == "centroids":
+        return load_artifact(CentroidBackend.load, settings.playlist_clusters_path)
+    return PgvectorBackend(
+        settings.pgvector_ef_search, settings.pgvector_probes,
+        returns_track_ids=settings.track_storage == "id",
+        driver=settings.pgvector_driver,
+        server_side_dedup=settings.pgvector_dedup == "server",
+        stream_batch_size=settings.clustering_stream_batch_size)
@@ -1,12 +1,42 @@
+from typing import Literal, Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     tokenizer_path: str
+    tfidf_path: Optional[str] = None
+    query_vector_cache_size: int = 10000
+    query_vector_warmup_path: Optional[str] = None
     postgres_host: str
     postgres_port: str
     postgres_user: str
     postgres_password: str
     postgres_db: str
+    postgres_pool_size: int = 5
+    postgres_max_overflow: int = 10
+    postgres_pool_timeout: float = 30
+    postgres_pool_recycle_seconds: int = 0
+    postgres_pool_pre_ping: bool = True
+    postgres_statement_cache_size: int = 100
+    track_dictionary_path: Optional[str] = None
+    track_storage: Literal["uri", "id"] = "uri"
+    popular_tracks_path: Optional[str] = None
+    clustering_min_query_idf: float = 0.0
+    clustering_adaptive_neighbors: bool = False
+    clustering_max_neighbors: int = 50
+    clustering_stream_batch_size: int = 5
+    pgvector_ef_search: int = 0
+    pgvector_probes: int = 0
+    pgvector_storage: Literal["vector", "halfvec", "sparsevec"] = "vector"
+    pgvector_index: Literal["hnsw", "ivfflat", "none"] = "hnsw"
+    pgvector_driver: Literal["sqlalchemy", "asyncpg"] = "sqlalchemy"
+    pgvector_dedup: Literal["client", "server"] = "client"
+    vector_search_backend: Literal["pgvector", "qdrant", "numpy", "postings", "centroids"] = "pgvector"
+    qdrant_url: str = "http://localhost:6333"
+    qdrant_api_key: Optional[str] = None
+    qdrant_collection: str = "playlists"
+    playlist_embeddings_path: str = "artifacts/playlist_embeddings"
+    playlist_clusters_path: str = "artifacts/playlist_clusters"
 
     class Config:
         env_file = ".env"
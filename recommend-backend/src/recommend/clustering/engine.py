@@ -1,7 +1,17 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+import asyncio
+import logging
+from typing import Dict
+
+import asyncpg
+from pgvector.asyncpg import register_vector
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import sessionmaker
 
 from src.recommend.clustering.config import settings
+from src.recommend.connections import asyncpg_pool_options, create_postgres_engine
+
+logger = logging.getLogger(__name__)
 
 PG_HOST = settings.postgres_host
 PG_PORT = settings.postgres_port
@@ -11,5 +21,36 @@ PG_DB = settings.postgres_db
 
 ASYNC_DATABASE_URL = f"postgresql+asyncpg://{PG_USER}:{PG_PASSWORD}@{PG_HOST}:{PG_PORT}/{PG_DB}"
 
-async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=False)
-AsyncSessionLocal = sessionmaker(async_engine, expire_on_commit=False, class_=AsyncSession)
\ No newline at end of file
+async_engine = create_postgres_engine(ASYNC_DATABASE_URL, settings)
+AsyncSessionLocal = sessionmaker(async_engine, expire_on_commit=False, class_=AsyncSession)
+
+
+async def create_asyncpg_pool(server_settings: Dict[str, str]) -> asyncpg.Pool:
+    """
+    Raw asyncpg pool for the lean query path, with the binary pgvector codecs
+    registered on every connection and `server_settings` applied at connect.
+    Sized like the SQLAlchemy engine's pool.
+    """
+    return await asyncpg.create_pool(
+        host=PG_HOST,
+        port=int(PG_PORT),
+        user=PG_USER,
+        password=PG_PASSWORD,
+        database=PG_DB,
+        server_settings=server_settings,
+        init=register_vector,
+        **asyncpg_pool_options(settings),
+    )
+
+
+async def warm_up_engine() -> None:
+    """
+    Fill the SQLAlchemy engine's pool by holding `pool_size` connections at
+    once, so the first requests skip the connect and authentication handshake.
+    """
+    async def ping() -> None:
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(ping() for _ in range(async_engine.pool.size())))
+    logger.info(f"Opened {async_engine.pool.checkedin()} pooled Postgres connections.")
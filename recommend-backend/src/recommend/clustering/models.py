@@ -1,10 +1,50 @@
+from typing import List, Union
+
+import numpy as np
 
 from sqlalchemy import Integer, String, ARRAY
 from sqlalchemy.orm import DeclarativeBase, mapped_column
-from pgvector.sqlalchemy import Vector
+from pgvector import SparseVector
+from pgvector.sqlalchemy import HALFVEC, SPARSEVEC, Vector
+
+from src.recommend.clustering.config import settings
+from src.recommend.clustering.tfidf import QueryVector
 
 VECTOR_DIM = 500
 
+# Must match the TRACK_STORAGE the table was loaded with.
+TRACK_TYPE = Integer if settings.track_storage == "id" else String
+
+# Must match the PGVECTOR_STORAGE the table was loaded with.
+EMBEDDING_TYPES = {
+    "vector": Vector,
+    "halfvec": HALFVEC,
+    "sparsevec": SPARSEVEC,
+}
+EMBEDDING_TYPE = EMBEDDING_TYPES[settings.pgvector_storage]
+
+Embedding = Union[List[float], SparseVector]
+
+
+def to_embedding(query: QueryVector) -> Embedding:
+    """Convert a TF-IDF query into a parameter for the embedding column."""
+    if settings.pgvector_storage == "sparsevec":
+        return SparseVector(dict(zip(query.indices.tolist(), query.data.tolist())), query.dim)
+    return query.dense().tolist()
+
+
+def to_binary_embedding(query: QueryVector) -> Union[np.ndarray, SparseVector]:
+    """
+    Convert a TF-IDF query for the binary asyncpg codecs: a float32 buffer
+    (also accepted for halfvec) instead of a list of Python floats.
+    """
+    if settings.pgvector_storage == "sparsevec":
+        return SparseVector(dict(zip(query.indices.tolist(), query.data.tolist())), query.dim)
+    vector = np.zeros(query.dim, dtype=np.float32)
+    vector[query.indices] = query.data
+    return vector
+
+
 class Base(DeclarativeBase):
     pass
 
@@ -13,5 +53,5 @@ class Playlist(Base):
 
     id = mapped_column(Integer, primary_key=True)
     name = mapped_column(String, nullable=False)
-    tracks = mapped_column(ARRAY(String), nullable=False)
-    embedding = mapped_column(Vector(VECTOR_DIM), nullable=False)
\ No newline at end of file
+    tracks = mapped_column(ARRAY(TRACK_TYPE), nullable=False)
+    embedding = mapped_column(EMBEDDING_TYPE(VECTOR_DIM), nullable=False)
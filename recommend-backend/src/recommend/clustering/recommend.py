@@ -1,26 +1,66 @@
 import logging
-from typing import List
+from typing import AsyncIterator, Dict, List, Optional, Union
 
-from sklearn.feature_extraction.text import TfidfVectorizer
+import asyncpg
+import numpy as np
+from pgvector import SparseVector
 
-from src.recommend.clustering.models import Playlist
-from sqlalchemy import select
+from src.recommend.clustering.config import settings
+from src.recommend.clustering.models import EMBEDDING_TYPE, VECTOR_DIM, Embedding, Playlist
+from sqlalchemy import bindparam, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.recommend.clustering.engine import AsyncSessionLocal
+from src.recommend.connections import acquire
+from src.recommend.dictionary import TrackRef
 
 logger = logging.getLogger(__name__)
 
-async def recommend_clustering(
-    vectorizer: TfidfVectorizer,
-    playlist_name: str,
-    k: int = 10,
-    n_neighbors: int = 5
-) -> List[str]:
-    logging.info(f"Querying pgvector for playlist: '{playlist_name}'")
-    query_vec = vectorizer.transform([playlist_name]).toarray()[0].tolist()
+# pgvector's hnsw.ef_search when none is configured.
+DEFAULT_HNSW_EF_SEARCH = 40
+
+
+def hnsw_ef_search(n_neighbors: int, ef_search: Optional[int] = None) -> int:
+    """The configured `hnsw.ef_search`, raised to `n_neighbors`: an HNSW scan returns at most ef_search rows."""
+    return max(ef_search or DEFAULT_HNSW_EF_SEARCH, n_neighbors)
+
+
+async def set_search_params(
+    session: AsyncSession,
+    n_neighbors: int,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None
+) -> None:
+    """
+    Set the pgvector recall knobs for the current transaction only.
+
+    `SET LOCAL` keeps the values from leaking to other requests through the
+    connection pool. With an HNSW index (`pgvector_index`) `hnsw.ef_search`
+    is always set, to at least `n_neighbors`; otherwise unset (None or 0)
+    knobs keep the server defaults.
 
+    Args:
+        session: Session whose transaction runs the similarity query.
+        n_neighbors: Number of playlists the query asks for.
+        ef_search: HNSW candidate list size.
+        probes: Number of IVFFlat lists to scan.
+    """
+    if settings.pgvector_index == "hnsw":
+        await session.execute(text(f"SET LOCAL hnsw.ef_search = {hnsw_ef_search(n_neighbors, ef_search)}"))
+    if probes:
+        await session.execute(text(f"SET LOCAL ivfflat.probes = {int(probes)}"))
+
+
+async def nearest_playlists(
+    query_vec: Embedding,
+    n_neighbors: int = 5,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None
+) -> List[List[TrackRef]]:
+    """Track lists of the `n_neighbors` playlists nearest to `query_vec`, nearest first."""
     async with AsyncSessionLocal() as session:
+        await set_search_params(session, n_neighbors, ef_search, probes)
         stmt = (
-            select(Playlist)
+            select(Playlist.tracks)
             .order_by(Playlist.embedding.l2_distance(query_vec))
             .limit(n_neighbors)
         )
@@ -28,10 +68,196 @@ async def recommend_clustering(
         similar_playlists = result.scalars().all()
 
     logger.info(f"Retrieved {len(similar_playlists)} similar playlists.")
+    return [list(tracks) for tracks in similar_playlists]
+
+
+# Only the tracks column crosses the wire; the cast pins the operator to the column type.
+NEAREST_PLAYLIST_TRACKS_SQL = (
+    "SELECT tracks FROM playlists "
+    f"ORDER BY embedding <-> $1::{settings.pgvector_storage} LIMIT $2"
+)
+
+
+async def nearest_playlists_asyncpg(
+    pool: asyncpg.Pool,
+    query_vec: Union[np.ndarray, SparseVector],
+    n_neighbors: int = 5,
+    min_ef_search: Optional[int] = None
+) -> List[List[TrackRef]]:
+    """
+    Track lists of the `n_neighbors` playlists nearest to `query_vec`, on a raw
+    asyncpg connection.
+
+    `fetch` goes through asyncpg's per-connection statement cache, so the
+    query is parsed and planned once per connection and then runs as a
+    prepared statement with a binary-encoded vector. The recall knobs are set
+    on the pool's connections; only when `n_neighbors` exceeds the pool's
+    `hnsw.ef_search` (pgvector's default when unset) is it raised for this
+    query's transaction.
+
+    Args:
+        pool: Pool created by `create_asyncpg_pool`.
+        query_vec: Query in the binary codec form from `to_binary_embedding`.
+        n_neighbors: Number of similar playlists to retrieve.
+        min_ef_search: `hnsw.ef_search` the pool's connections use, if set.
+    """
+    rows = await _fetch_asyncpg(pool, NEAREST_PLAYLIST_TRACKS_SQL, (query_vec, n_neighbors), n_neighbors, min_ef_search)
+    logger.info(f"Retrieved {len(rows)} similar playlists.")
+    return [row["tracks"] for row in rows]
+
+
+async def _fetch_asyncpg(
+    pool: asyncpg.Pool,
+    sql: str,
+    args: tuple,
+    n_neighbors: int,
+    min_ef_search: Optional[int]
+) -> List[asyncpg.Record]:
+    async with acquire(pool, settings.postgres_pool_timeout) as connection:
+        if settings.pgvector_index == "hnsw" and n_neighbors > hnsw_ef_search(0, min_ef_search):
+            async with connection.transaction():
+                await connection.execute("SELECT set_config('hnsw.ef_search', $1, true)", str(n_neighbors))
+                return await connection.fetch(sql, *args)
+        return await connection.fetch(sql, *args)
+
+
+async def stream_nearest_playlists(
+    query_vec: Embedding,
+    max_neighbors: int = 50,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    batch_size: int = 5
+) -> AsyncIterator[List[TrackRef]]:
+    """
+    Yield the track lists of the playlists nearest to `query_vec`, nearest
+    first, up to `max_neighbors`. Rows are fetched `batch_size` at a time
+    through a server-side cursor, so a consumer that stops early leaves the
+    rest of the index scan unread.
+    """
+    async with AsyncSessionLocal() as session:
+        await set_search_params(session, max_neighbors, ef_search, probes)
+        stmt = (
+            select(Playlist.tracks)
+            .order_by(Playlist.embedding.l2_distance(query_vec))
+            .limit(max_neighbors)
+            .execution_options(yield_per=batch_size)
+        )
+        result = await session.stream_scalars(stmt)
+        async for tracks in result:
+            yield list(tracks)
+
+
+async def stream_nearest_playlists_asyncpg(
+    pool: asyncpg.Pool,
+    query_vec: Union[np.ndarray, SparseVector],
+    max_neighbors: int = 50,
+    min_ef_search: Optional[int] = None,
+    batch_size: int = 5
+) -> AsyncIterator[List[TrackRef]]:
+    """`stream_nearest_playlists` on the raw asyncpg path, with a prefetching cursor."""
+    async with acquire(pool, settings.postgres_pool_timeout) as connection:
+        async with connection.transaction():
+            if settings.pgvector_index == "hnsw" and max_neighbors > hnsw_ef_search(0, min_ef_search):
+                await connection.execute("SELECT set_config('hnsw.ef_search', $1, true)", str(max_neighbors))
+            cursor = connection.cursor(NEAREST_PLAYLIST_TRACKS_SQL, query_vec, max_neighbors, prefetch=batch_size)
+            async for row in cursor:
+                yield row["tracks"]
+
+
+async def collect_unique_tracks(playlists: AsyncIterator[List[TrackRef]], k: int = 10) -> List[TrackRef]:
+    """
+    Consume playlists until `k` unique tracks are collected, then close the
+    stream. Returns the same tracks as `merge_playlist_tracks` over every
+    playlist the stream could have produced.
+    """
+    unique_tracks: Dict[TrackRef, None] = {}
+    neighbors = 0
+    try:
+        async for tracks in playlists:
+            neighbors += 1
+            for track in tracks:
+                unique_tracks.setdefault(track)
+            if len(unique_tracks) >= k:
+                break
+    finally:
+        await playlists.aclose()
+
+    logger.info(f"Found {len(unique_tracks)} unique recommended tracks in {neighbors} similar playlists.")
+    return list(unique_tracks)[:k]
+
+
+def _unique_tracks_sql(query_vec: str, n_neighbors: str, k: str) -> str:
+    """
+    Statement returning the first `k` unique tracks of the nearest playlists,
+    in playlist-distance then track-position order.
+
+    The neighbours are found through the vector index, their track arrays are
+    expanded with their positions, `DISTINCT ON` keeps each track's first
+    occurrence and only the surviving `k` tracks are sent back.
+    """
+    return f"""
+        WITH nearest AS (
+            SELECT id, tracks, embedding <-> {query_vec} AS distance
+            FROM playlists
+            ORDER BY embedding <-> {query_vec}
+            LIMIT {n_neighbors}
+        ),
+        first_occurrences AS (
+            SELECT DISTINCT ON (t.track) t.track, n.distance, n.id, t.position
+            FROM nearest AS n, unnest(n.tracks) WITH ORDINALITY AS t(track, position)
+            ORDER BY t.track, n.distance, n.id, t.position
+        )
+        SELECT track FROM first_occurrences
+        ORDER BY distance, id, position
+        LIMIT {k}
+    """
+
+
+UNIQUE_TRACKS_SQL = _unique_tracks_sql(f"$1::{settings.pgvector_storage}", "$2", "$3")
+UNIQUE_TRACKS_STATEMENT = text(_unique_tracks_sql(":query_vec", ":n_neighbors", ":k")).bindparams(
+    bindparam("query_vec", type_=EMBEDDING_TYPE(VECTOR_DIM)))
+
+
+async def recommend_clustering_server_side(
+    query_vec: Embedding,
+    k: int = 10,
+    n_neighbors: int = 5,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None
+) -> List[TrackRef]:
+    """
+    First `k` unique tracks of the `n_neighbors` nearest playlists, with the
+    expansion and de-duplication of the neighbours' tracks run in Postgres,
+    so only `k` tracks cross the wire.
+    """
+    async with AsyncSessionLocal() as session:
+        await set_search_params(session, n_neighbors, ef_search, probes)
+        result = await session.execute(
+            UNIQUE_TRACKS_STATEMENT, {"query_vec": query_vec, "n_neighbors": n_neighbors, "k": k})
+        tracks = list(result.scalars().all())
+
+    logger.info(f"Found {len(tracks)} unique recommended tracks.")
+    return tracks
+
+
+async def recommend_clustering_server_side_asyncpg(
+    pool: asyncpg.Pool,
+    query_vec: Union[np.ndarray, SparseVector],
+    k: int = 10,
+    n_neighbors: int = 5,
+    min_ef_search: Optional[int] = None
+) -> List[TrackRef]:
+    """Server-side de-duplication on the raw asyncpg path; see `nearest_playlists_asyncpg`."""
+    rows = await _fetch_asyncpg(pool, UNIQUE_TRACKS_SQL, (query_vec, n_neighbors, k), n_neighbors, min_ef_search)
+    logger.info(f"Found {len(rows)} unique recommended tracks.")
+    return [row["track"] for row in rows]
+
 
+def merge_playlist_tracks(playlists: List[List[TrackRef]], k: int = 10) -> List[TrackRef]:
+    """First `k` unique tracks of the playlists, in playlist then track order."""
     recommended_tracks = []
-    for pl in similar_playlists:
-        recommended_tracks.extend(pl.tracks)
+    for tracks in playlists:
+        recommended_tracks.extend(tracks)
 
     unique_tracks = list(dict.fromkeys(recommended_tracks))
     logger.info(f"Found {len(unique_tracks)} unique recommended tracks.")
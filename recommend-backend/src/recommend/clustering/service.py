@@ -1,20 +1,49 @@
+import json
 import logging
-from typing import List
-
-import joblib
-from qdrant_client import AsyncQdrantClient
-from sklearn.feature_extraction.text import TfidfVectorizer
+from typing import List, Optional, Tuple
 
+from src.recommend.artifacts import load_artifact
+from src.recommend.cache import TieredCache, clustering_key
 from src.recommend.clustering.config import Settings
-from src.recommend.clustering.recommend import recommend_clustering
+from src.recommend.clustering.backends import build_vector_search_backend
+from src.recommend.clustering.tfidf import CachedScorer, QueryVector, load_scorer
+from src.recommend.dictionary import TrackDictionary
+from src.recommend.metrics import observe_stage
+from src.recommend.singleflight import SingleFlight
+from src.recommend.tracing import span
 
 logger = logging.getLogger(__name__)
 
 
 class ClusteringRecommendService:
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, cache: Optional[TieredCache] = None):
         self.tokenizer_path = settings.tokenizer_path
-        self.vectorizer: TfidfVectorizer = joblib.load(self.tokenizer_path)
+        self.vectorizer = load_artifact(load_scorer, settings.tfidf_path, self.tokenizer_path)
+        if settings.query_vector_cache_size > 0:
+            self.vectorizer = CachedScorer(self.vectorizer, settings.query_vector_cache_size)
+            if settings.query_vector_warmup_path:
+                with open(settings.query_vector_warmup_path) as f:
+                    self.vectorizer.warm_up(json.load(f))
+        self.cache = cache
+        self.singleflight = SingleFlight()
+        self.min_query_idf = settings.clustering_min_query_idf
+        self.adaptive_neighbors = settings.clustering_adaptive_neighbors
+        self.max_neighbors = settings.clustering_max_neighbors
+        self.popular_tracks: Optional[List[str]] = None
+        if settings.popular_tracks_path:
+            with open(settings.popular_tracks_path) as f:
+                self.popular_tracks = json.load(f)
+            logger.info(f"Loaded {len(self.popular_tracks)} popular tracks from {settings.popular_tracks_path}.")
+        self.out_of_vocabulary_hits = 0
+        self.backend_name = settings.vector_search_backend
+        self.search_backend = build_vector_search_backend(settings)
+        self.dictionary: Optional[TrackDictionary] = None
+        if self.search_backend.returns_track_ids:
+            if not settings.track_dictionary_path:
+                raise ValueError(
+                    f"The '{self.backend_name}' vector search backend with TRACK_STORAGE={settings.track_storage} "
+                    "returns track ids and requires TRACK_DICTIONARY_PATH to be set.")
+            self.dictionary = load_artifact(TrackDictionary.load, settings.track_dictionary_path)
 
     async def recommend_tracks(
         self,
@@ -23,10 +52,20 @@ class ClusteringRecommendService:
         n_neighbors: int = 5
     ) -> List[str]:
         """
-        Asynchronously recommend tracks from Qdrant based on a playlist name using TF-IDF vector similarity.
+        Asynchronously recommend tracks from the configured vector search backend
+        (pgvector, Qdrant, the in-process NumPy or postings index, or the
+        precomputed KMeans clusters) based on a playlist name using TF-IDF
+        vector similarity. For the `centroids` backend the nearest clusters
+        take the place of the nearest playlists.
+
+        With `clustering_adaptive_neighbors`, `n_neighbors` is ignored: neighbours
+        are read nearest first until `k` unique tracks are found, up to
+        `clustering_max_neighbors`.
+
+        Results are cached per normalized playlist name, `k` and `n_neighbors`,
+        and concurrent identical requests share a single backend query.
 
         Args:
-            vectorizer: Fitted TfidfVectorizer for playlist names.
             playlist_name: Name of the query playlist.
             k: Max number of unique recommended tracks.
             n_neighbors: Number of similar playlists to retrieve.
@@ -34,9 +73,58 @@ class ClusteringRecommendService:
         Returns:
             A list of up to `k` unique recommended track URIs.
         """
-        return await recommend_clustering(
-            vectorizer=self.vectorizer,
-            playlist_name=playlist_name,
-            k=k,
-            n_neighbors=n_neighbors
-        )
+        if self.adaptive_neighbors:
+            n_neighbors = self.max_neighbors
+        key = clustering_key(playlist_name, k, n_neighbors, self.vectorizer.lowercase)
+        with span("clustering.recommend_tracks", k=k, n_neighbors=n_neighbors) as current:
+            if self.cache is not None:
+                cached = await self.cache.get(key)
+                if cached is not None:
+                    if current is not None:
+                        current.attributes["cache_hit"] = True
+                    return cached
+
+            recommended = await self.singleflight.do(
+                key, lambda: self._compute_and_store(key, playlist_name, k, n_neighbors))
+            return list(recommended)
+
+    async def _compute_and_store(self, key: Tuple, playlist_name: str, k: int, n_neighbors: int) -> List[str]:
+        recommended = await self._compute(playlist_name, k, n_neighbors)
+        if self.cache is not None:
+            await self.cache.set(key, recommended)
+        return recommended
+
+    def is_out_of_vocabulary(self, query: QueryVector) -> bool:
+        """
+        True when a query vector carries no usable signal: no token of the name
+        is in the vocabulary, or every matched token is too common (idf below
+        `clustering_min_query_idf`) to tell playlists apart.
+        """
+        if query.nnz == 0:
+            return True
+        return self.min_query_idf > 0 and self.vectorizer.idf[query.indices].max() < self.min_query_idf
+
+    async def _compute(self, playlist_name: str, k: int, n_neighbors: int) -> List[str]:
+        with observe_stage("tfidf", "vectorize"):
+            query = self.vectorizer.transform(playlist_name)
+
+        if self.popular_tracks is not None and self.is_out_of_vocabulary(query):
+            self.out_of_vocabulary_hits += 1
+            logger.info(f"Serving popular tracks for out-of-vocabulary playlist: '{playlist_name}'")
+            return self.popular_tracks[:k]
+
+        logger.info(f"Querying {self.backend_name} for playlist: '{playlist_name}'")
+        if self.adaptive_neighbors:
+            tracks = await self.search_backend.recommend_adaptive(query, k, n_neighbors)
+        else:
+            tracks = await self.search_backend.recommend(query, k, n_neighbors)
+        if self.search_backend.returns_track_ids:
+            with observe_stage("dictionary", "decode"):
+                return self.dictionary.decode(tracks)
+        return tracks
+
+    async def warm_up(self) -> None:
+        await self.search_backend.warm_up()
+
+    async def close(self) -> None:
+        await self.search_backend.close()
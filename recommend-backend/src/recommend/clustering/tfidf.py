@@ -0,0 +1,195 @@
+import json
+import logging
+import re
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Union
+
+import numpy as np
+
+from src.recommend.cache import normalize_playlist_name
+
+logger = logging.getLogger(__name__)
+
+
+class QueryVector(NamedTuple):
+    """A TF-IDF row as its non-zero term ids (ascending) and weights."""
+    indices: np.ndarray
+    data: np.ndarray
+    dim: int
+
+    @property
+    def nnz(self) -> int:
+        return len(self.indices)
+
+    def dense(self) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float64)
+        vector[self.indices] = self.data
+        return vector
+
+
+class TfidfScorer:
+    """
+    Serve-time replacement for the fitted sklearn `TfidfVectorizer`.
+
+    Loads the vocabulary, idf weights and tokenizer rules written by
+    `export_tfidf_scorer.py` and reproduces `vectorizer.transform([name])`
+    for one name with plain `re` and NumPy, so the service needs neither
+    scikit-learn nor scipy. Only the options our vectorizers use are
+    supported: word unigrams, optional lowercasing, raw or sublinear tf,
+    idf weighting and l2/l1/no normalization.
+    """
+
+    def __init__(
+        self,
+        vocabulary: np.ndarray,
+        idf: np.ndarray,
+        token_pattern: str,
+        lowercase: bool = True,
+        sublinear_tf: bool = False,
+        norm: Optional[str] = "l2"
+    ):
+        # The vocabulary is sorted, so a term's position is its column, as in sklearn.
+        self.vocabulary: Dict[str, int] = {str(term): i for i, term in enumerate(vocabulary)}
+        self.idf = idf
+        self.token_pattern = re.compile(token_pattern)
+        self.lowercase = lowercase
+        self.sublinear_tf = sublinear_tf
+        self.norm = norm
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "TfidfScorer":
+        path = Path(path)
+        with open(path / "tokenizer.json") as f:
+            rules = json.load(f)
+        scorer = cls(
+            vocabulary=np.load(path / "vocabulary.npy", mmap_mode="r"),
+            idf=np.load(path / "idf.npy", mmap_mode="r"),
+            **rules,
+        )
+        logger.info(f"Loaded TF-IDF scorer with {len(scorer.vocabulary)} terms from {path}.")
+        return scorer
+
+    @property
+    def dim(self) -> int:
+        return len(self.idf)
+
+    def tokenize(self, text: str) -> List[str]:
+        if self.lowercase:
+            text = text.lower()
+        return self.token_pattern.findall(text)
+
+    def transform(self, text: str) -> QueryVector:
+        counts: Dict[int, int] = {}
+        for token in self.tokenize(text):
+            column = self.vocabulary.get(token)
+            if column is not None:
+                counts[column] = counts.get(column, 0) + 1
+
+        indices = np.array(sorted(counts), dtype=np.int32)
+        tf = np.array([counts[i] for i in indices], dtype=np.float64)
+        if self.sublinear_tf:
+            tf = np.log(tf) + 1
+        data = tf * self.idf[indices]
+
+        if self.norm == "l2" and len(data):
+            data = data / np.sqrt(np.sum(data * data))
+        elif self.norm == "l1" and len(data):
+            data = data / np.sum(np.abs(data))
+        return QueryVector(indices, data, self.dim)
+
+
+class SklearnTfidfScorer:
+    """Adapts a pickled sklearn `TfidfVectorizer` to the `TfidfScorer` interface."""
+
+    def __init__(self, vectorizer):
+        self.vectorizer = vectorizer
+        self.idf = vectorizer.idf_
+        self.lowercase = vectorizer.lowercase
+
+    @property
+    def dim(self) -> int:
+        return len(self.idf)
+
+    def transform(self, text: str) -> QueryVector:
+        row = self.vectorizer.transform([text])
+        row.sort_indices()
+        return QueryVector(row.indices.astype(np.int32), row.data, self.dim)
+
+
+class CachedScorer:
+    """
+    LRU cache of query vectors in front of a scorer, keyed by the normalized
+    playlist name.
+
+    Normalizing collapses whitespace, and lower-cases only when the scorer
+    does, so it never changes the tokens of a word vectorizer. Cached vectors
+    are read-only, so callers cannot corrupt an entry shared with other
+    requests.
+    """
+
+    def __init__(self, scorer: Union[TfidfScorer, SklearnTfidfScorer], max_entries: int):
+        self.scorer = scorer
+        self.idf = scorer.idf
+        self.lowercase = scorer.lowercase
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, QueryVector]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def dim(self) -> int:
+        return self.scorer.dim
+
+    def transform(self, text: str) -> QueryVector:
+        key = normalize_playlist_name(text, self.lowercase)
+        query = self._entries.get(key)
+        if query is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return query
+
+        self.misses += 1
+        query = self.scorer.transform(key)
+        self._store(key, query)
+        return query
+
+    def warm_up(self, names: Iterable[str]) -> int:
+        """Vectorize `names` into the cache without counting lookups; returns the number cached."""
+        for name in names:
+            key = normalize_playlist_name(name, self.lowercase)
+            if key not in self._entries:
+                self._store(key, self.scorer.transform(key))
+        logger.info(f"Warmed up query vector cache with {len(self._entries)} names.")
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+        }
+
+    def _store(self, key: str, query: QueryVector) -> None:
+        query.indices.setflags(write=False)
+        query.data.setflags(write=False)
+        self._entries[key] = query
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+def load_scorer(tfidf_path: Optional[str], tokenizer_path: str) -> Union[TfidfScorer, SklearnTfidfScorer]:
+    """
+    Load the exported scorer when `tfidf_path` is set, otherwise fall back to
+    unpickling the sklearn vectorizer (which imports scikit-learn).
+    """
+    if tfidf_path:
+        return TfidfScorer.load(tfidf_path)
+
+    import joblib
+    return SklearnTfidfScorer(joblib.load(tokenizer_path))
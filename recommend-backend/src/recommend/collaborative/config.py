@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic_settings import BaseSettings
 
 
@@ -5,6 +7,16 @@ class Settings(BaseSettings):
     mongo_uri: str
     mongo_db_name: str
     mongo_max_neightbors: int = 50
+    mongo_batch_chunk_size: int = 25
+    mongo_max_pool_size: int = 100
+    mongo_min_pool_size: int = 0
+    mongo_wait_queue_timeout_ms: int = 0
+    mongo_max_idle_time_ms: int = 0
+    mongo_server_selection_timeout_ms: int = 30000
+    collaborative_engine: Literal["mongo", "aggregate", "neighbors", "matrix"] = "mongo"
+    cooccurrence_path: str = "artifacts/cooccurrence"
+    track_dictionary_path: Optional[str] = None
+    track_storage: Literal["uri", "id"] = "uri"
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,78 @@
+import logging
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class CooccurrenceMatrix:
+    """
+    Precomputed track x track co-occurrence counts stored as a CSR matrix.
+
+    Rows and columns are track dictionary ids. The arrays are memory-mapped
+    from the directory written by `prepare_cooccurrence_matrix.py`:
+
+        indptr.npy      int64, row offsets (n_tracks + 1)
+        indices.npy     int32, column ids of the non-zero entries
+        data.npy        int32, co-occurrence counts
+    """
+
+    def __init__(
+        self,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        data: np.ndarray
+    ):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+
+    @classmethod
+    def load(cls, path: str) -> "CooccurrenceMatrix":
+        directory = Path(path)
+        matrix = cls(
+            indptr=np.load(directory / "indptr.npy", mmap_mode="r"),
+            indices=np.load(directory / "indices.npy", mmap_mode="r"),
+            data=np.load(directory / "data.npy", mmap_mode="r"),
+        )
+        logger.info(
+            f"Loaded co-occurrence matrix with {len(matrix.indptr) - 1} tracks "
+            f"and {len(matrix.indices)} non-zero entries from {directory}.")
+        return matrix
+
+    def top_k(self, rows: np.ndarray, k: int) -> np.ndarray:
+        """
+        Sum the co-occurrence rows of the seeds and select the k best columns.
+
+        Args:
+            rows: Track ids of the seed tracks.
+            k: Max number of track ids to return.
+
+        Returns:
+            Track ids ordered by descending summed count, seeds excluded.
+        """
+        rows = rows[rows < len(self.indptr) - 1]
+        if len(rows) == 0 or k <= 0:
+            return np.empty(0, dtype=np.int32)
+
+        starts = self.indptr[rows]
+        ends = self.indptr[rows + 1]
+        columns = np.concatenate(
+            [self.indices[s:e] for s, e in zip(starts, ends)])
+        counts = np.concatenate(
+            [self.data[s:e] for s, e in zip(starts, ends)])
+
+        candidates, inverse = np.unique(columns, return_inverse=True)
+        scores = np.bincount(inverse, weights=counts)
+
+        keep = ~np.isin(candidates, rows)
+        candidates, scores = candidates[keep], scores[keep]
+
+        if len(candidates) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            candidates, scores = candidates[top], scores[top]
+
+        order = np.lexsort((candidates, -scores))
+        logger.info(f"Scored {len(keep)} co-occurring tracks for {len(rows)} seed tracks.")
+        return candidates[order]
@@ -6,14 +6,14 @@ from pydantic import Field
 
 class Playlist(Document):
     name: str
-    tracks: List[str]
+    tracks: List[int]  # Track dictionary ids
 
     class Settings:
         name = "playlists"
 
 
 class Track(Document):
-    id: str = Field(alias="_id")  # Track URI as _id
+    id: int = Field(alias="_id")  # Track dictionary id as _id
     pos: int
     artist_name: str
     track_uri: str
@@ -25,3 +25,12 @@ class Track(Document):
 
     class Settings:
         name = "tracks"
+
+
+class TrackNeighbors(Document):
+    id: int = Field(alias="_id")  # Track dictionary id as _id
+    tracks: List[int]  # Top co-occurring track ids, most frequent first
+    counts: List[int]
+
+    class Settings:
+        name = "track_neighbors"
@@ -1,33 +1,42 @@
 import logging
 from collections import Counter
-from typing import List
+from typing import Dict, List
 
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+from src.recommend.dictionary import TrackRef
+from src.recommend.metrics import observe_stage
 
 logger = logging.getLogger(__name__)
 
 
 async def recommend_collaborative(
     client: AsyncIOMotorClient,
-    query_uris: List[str],
+    query_uris: List[TrackRef],
     k: int = 10,
     max_neighbors: int = 50,
-    db_name: str = "spotify"
-) -> List[str]:
+    db_name: str = "spotify",
+    server_side: bool = False
+) -> List[TrackRef]:
     """
     Recommend tracks from MongoDB based on shared playlist co-occurrence using async Motor.
 
     Args:
         client: Async MongoDB client.
-        query_uris: List of seed track URIs.
+        query_uris: List of seed tracks (URIs or track dictionary ids).
         k: Max number of recommended tracks.
         max_neighbors: Max number of playlists to consider.
+        server_side: Count co-occurrences inside MongoDB with an aggregation
+            pipeline so only the top `k` tracks are sent back.
 
     Returns:
-        List of recommended track URIs.
+        List of recommended tracks, in the same representation as the seeds.
     """
     db = client[db_name]
 
+    if server_side:
+        return await _recommend_collaborative_aggregate(db, query_uris, k, max_neighbors)
+
     logging.info(f"Querying MongoDB for {len(query_uris)} seed tracks...")
 
     cursor = db.playlists.find(
@@ -35,15 +44,189 @@ async def recommend_collaborative(
         {"tracks": 1}
     ).limit(max_neighbors)
 
-    track_counter = Counter()
-    matched_playlists = 0
-    async for doc in cursor:
-        track_counter.update(doc["tracks"])
-        matched_playlists += 1
+    with observe_stage("mongo", "query"):
+        playlists = await cursor.to_list(length=None)
+
+    with observe_stage("mongo", "merge"):
+        track_counter = Counter()
+        for doc in playlists:
+            track_counter.update(doc["tracks"])
 
-    logger.info(f"Matched {matched_playlists} playlists.")
-    logger.info(f"Collected {len(track_counter)} unique tracks.")
+        logger.info(f"Matched {len(playlists)} playlists.")
+        logger.info(f"Collected {len(track_counter)} unique tracks.")
 
+        return _top_tracks(track_counter, query_uris, k)
+
+
+def _top_tracks(track_counter: Counter, query_uris: List[TrackRef], k: int) -> List[TrackRef]:
+    seeds = set(query_uris)
     recommended = [t for t, _ in track_counter.most_common()
-                   if t not in query_uris]
+                   if t not in seeds]
     return recommended[:k]
+
+
+async def _recommend_collaborative_aggregate(
+    db: AsyncIOMotorDatabase,
+    query_uris: List[TrackRef],
+    k: int,
+    max_neighbors: int
+) -> List[TrackRef]:
+    logging.info(f"Aggregating co-occurrences in MongoDB for {len(query_uris)} seed tracks...")
+
+    pipeline = [
+        {"$match": {"tracks": {"$in": query_uris}}},
+        {"$limit": max_neighbors},
+        {"$project": {"_id": 0, "tracks": 1}},
+        {"$unwind": "$tracks"},
+        {"$match": {"tracks": {"$nin": query_uris}}},
+        {"$group": {"_id": "$tracks", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1, "_id": 1}},
+        {"$limit": k},
+    ]
+
+    with observe_stage("mongo", "query"):
+        recommended = [doc["_id"] async for doc in db.playlists.aggregate(pipeline)]
+
+    logger.info(f"Aggregation returned {len(recommended)} tracks.")
+    return recommended
+
+
+async def recommend_collaborative_neighbors(
+    client: AsyncIOMotorClient,
+    query_uris: List[TrackRef],
+    k: int = 10,
+    db_name: str = "spotify"
+) -> List[TrackRef]:
+    """
+    Recommend tracks by merging the precomputed neighbour lists of the seed tracks.
+
+    Reads one small document per seed from the `track_neighbors` collection
+    built by `prepare_track_neighbors.py` and sums the co-occurrence counts.
+
+    Args:
+        client: Async MongoDB client.
+        query_uris: List of seed tracks (URIs or track dictionary ids).
+        k: Max number of recommended tracks.
+
+    Returns:
+        List of recommended tracks, in the same representation as the seeds.
+    """
+    db = client[db_name]
+
+    logging.info(f"Querying track neighbours for {len(query_uris)} seed tracks...")
+
+    with observe_stage("mongo", "query"):
+        neighbor_lists = await db.track_neighbors.find({"_id": {"$in": query_uris}}).to_list(length=None)
+
+    with observe_stage("mongo", "merge"):
+        track_counter = Counter()
+        for doc in neighbor_lists:
+            for track, count in zip(doc["tracks"], doc["counts"]):
+                track_counter[track] += count
+
+        logger.info(f"Matched {len(neighbor_lists)} neighbour lists.")
+        logger.info(f"Collected {len(track_counter)} unique tracks.")
+
+        return _top_tracks(track_counter, query_uris, k)
+
+
+def _seed_index(seed_lists: List[List[TrackRef]]) -> Dict[TrackRef, List[int]]:
+    """Map every seed track to the positions of the seed lists containing it."""
+    index: Dict[TrackRef, List[int]] = {}
+    for i, seeds in enumerate(seed_lists):
+        for seed in dict.fromkeys(seeds):
+            index.setdefault(seed, []).append(i)
+    return index
+
+
+async def recommend_collaborative_batch(
+    client: AsyncIOMotorClient,
+    seed_lists: List[List[TrackRef]],
+    k: int = 10,
+    max_neighbors: int = 50,
+    db_name: str = "spotify"
+) -> List[List[TrackRef]]:
+    """
+    Answer many independent seed lists with a single MongoDB query.
+
+    One `find` matches the union of all seeds and streams the playlists.
+    Each playlist is counted for every seed list it shares a seed with, until
+    that list has its own `max_neighbors` playlists, as a single-list query
+    would. The cursor is closed once every list is full.
+
+    Args:
+        client: Async MongoDB client.
+        seed_lists: Seed tracks (URIs or track dictionary ids) of each request.
+        k: Max number of recommended tracks per request.
+        max_neighbors: Max number of playlists to consider per request.
+
+    Returns:
+        One list of recommended tracks per seed list, in the same order.
+    """
+    db = client[db_name]
+    index = _seed_index(seed_lists)
+    if not index:
+        return [[] for _ in seed_lists]
+
+    logging.info(f"Querying MongoDB for {len(seed_lists)} seed lists ({len(index)} unique seeds)...")
+
+    counters = [Counter() for _ in seed_lists]
+    neighbors = [0] * len(seed_lists)
+    open_lists = sum(1 for seeds in seed_lists if seeds)
+    matched_playlists = 0
+
+    cursor = db.playlists.find({"tracks": {"$in": list(index)}}, {"_id": 0, "tracks": 1})
+    with observe_stage("mongo", "query"):
+        async for doc in cursor:
+            matched_playlists += 1
+            lists = {i for track in doc["tracks"] if track in index for i in index[track]}
+            for i in lists:
+                if neighbors[i] < max_neighbors:
+                    counters[i].update(doc["tracks"])
+                    neighbors[i] += 1
+                    if neighbors[i] == max_neighbors:
+                        open_lists -= 1
+            if open_lists == 0:
+                break
+        await cursor.close()
+
+    logger.info(f"Matched {matched_playlists} playlists across {len(seed_lists)} seed lists.")
+    with observe_stage("mongo", "merge"):
+        return [_top_tracks(counter, seeds, k) for counter, seeds in zip(counters, seed_lists)]
+
+
+async def recommend_collaborative_neighbors_batch(
+    client: AsyncIOMotorClient,
+    seed_lists: List[List[TrackRef]],
+    k: int = 10,
+    db_name: str = "spotify"
+) -> List[List[TrackRef]]:
+    """
+    Merge precomputed neighbour lists for many seed lists with a single query.
+
+    Args:
+        client: Async MongoDB client.
+        seed_lists: Seed tracks (URIs or track dictionary ids) of each request.
+        k: Max number of recommended tracks per request.
+
+    Returns:
+        One list of recommended tracks per seed list, in the same order.
+    """
+    db = client[db_name]
+    index = _seed_index(seed_lists)
+    if not index:
+        return [[] for _ in seed_lists]
+
+    logging.info(f"Querying track neighbours for {len(seed_lists)} seed lists ({len(index)} unique seeds)...")
+
+    with observe_stage("mongo", "query"):
+        neighbor_lists = await db.track_neighbors.find({"_id": {"$in": list(index)}}).to_list(length=None)
+
+    with observe_stage("mongo", "merge"):
+        counters = [Counter() for _ in seed_lists]
+        for doc in neighbor_lists:
+            for i in index[doc["_id"]]:
+                for track, count in zip(doc["tracks"], doc["counts"]):
+                    counters[i][track] += count
+
+        return [_top_tracks(counter, seeds, k) for counter, seeds in zip(counters, seed_lists)]
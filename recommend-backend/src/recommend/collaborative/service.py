@@ -1,18 +1,45 @@
-from typing import List
-
-from motor.motor_asyncio import AsyncIOMotorClient
+import logging
+from typing import List, Optional, Tuple
 
+from src.recommend.artifacts import load_artifact
+from src.recommend.cache import TieredCache, collaborative_key
 from src.recommend.collaborative.config import Settings
-from src.recommend.collaborative.recommend import recommend_collaborative
+from src.recommend.collaborative.cooccurrence import CooccurrenceMatrix
+from src.recommend.collaborative.recommend import (
+    recommend_collaborative, recommend_collaborative_batch,
+    recommend_collaborative_neighbors, recommend_collaborative_neighbors_batch)
+from src.recommend.connections import create_mongo_client
+from src.recommend.dictionary import TrackDictionary, TrackRef
+from src.recommend.metrics import observe_stage
+from src.recommend.singleflight import SingleFlight
+from src.recommend.tracing import span
+
+logger = logging.getLogger(__name__)
 
 
 class CollaborativeRecommendService:
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, cache: Optional[TieredCache] = None):
         self.db_name = settings.mongo_db_name
         self.mongo_uri = settings.mongo_uri
-        self.client = AsyncIOMotorClient(self.mongo_uri)
+        self.client = create_mongo_client(settings)
         self.db_name = settings.mongo_db_name
         self.max_neighbors = settings.mongo_max_neightbors
+        self.batch_chunk_size = settings.mongo_batch_chunk_size
+        self.engine = settings.collaborative_engine
+        self.cache = cache
+        self.singleflight = SingleFlight()
+        # The matrix is indexed by track id whatever the MongoDB collections store.
+        self.uses_track_ids = self.engine == "matrix" or settings.track_storage == "id"
+        self.dictionary: Optional[TrackDictionary] = None
+        if self.uses_track_ids:
+            if not settings.track_dictionary_path:
+                raise ValueError(
+                    f"The '{self.engine}' collaborative engine with TRACK_STORAGE={settings.track_storage} "
+                    "uses track ids and requires TRACK_DICTIONARY_PATH to be set.")
+            self.dictionary = load_artifact(TrackDictionary.load, settings.track_dictionary_path)
+        self.cooccurrence: Optional[CooccurrenceMatrix] = None
+        if self.engine == "matrix":
+            self.cooccurrence = load_artifact(CooccurrenceMatrix.load, settings.cooccurrence_path)
 
     async def recommend_tracks(
         self,
@@ -20,14 +47,127 @@ class CollaborativeRecommendService:
         k: int = 10,
     ) -> List[str]:
         """
-        Recommend tracks based on collaborative filtering from MongoDB.
+        Recommend tracks based on collaborative filtering.
+
+        Uses the in-memory co-occurrence matrix for the `matrix` engine, the
+        precomputed `track_neighbors` collection for the `neighbors` engine,
+        and otherwise counts co-occurrences of playlists from MongoDB, either
+        in Python (`mongo`) or in an aggregation pipeline (`aggregate`).
+        Results are cached per seed set and `k`, and concurrent identical
+        requests share a single backend query.
+
+        With `track_storage` "id", and always for the matrix, the stores hold
+        int32 track ids: seeds are encoded on the way in and decoded on the
+        way out.
 
         Args:
             query_uris: List of seed track URIs.
             k: Max number of recommended tracks.
-            max_neighbors: Max number of playlists to consider.
 
         Returns:
             List of recommended track URIs.
         """
-        return await recommend_collaborative(self.client, query_uris, k, self.max_neighbors, self.db_name)
+        key = collaborative_key(query_uris, k)
+        with span("collaborative.recommend_tracks", k=k, seeds=len(query_uris), engine=self.engine) as current:
+            if self.cache is not None:
+                cached = await self.cache.get(key)
+                if cached is not None:
+                    if current is not None:
+                        current.attributes["cache_hit"] = True
+                    return cached
+
+            recommended = await self.singleflight.do(key, lambda: self._compute_and_store(key, query_uris, k))
+            return list(recommended)
+
+    async def recommend_tracks_batch(
+        self,
+        seed_lists: List[List[str]],
+        k: int = 10,
+    ) -> List[List[str]]:
+        """
+        Recommend tracks for many independent seed lists at once.
+
+        Cached lists are served from the cache; the rest are answered with one
+        MongoDB query per `mongo_batch_chunk_size` lists, or one pass over
+        the in-memory co-occurrence matrix for the `matrix` engine.
+
+        Args:
+            seed_lists: Seed track URIs of each request.
+            k: Max number of recommended tracks per request.
+
+        Returns:
+            One list of recommended track URIs per seed list, in the same order.
+        """
+        if self.cache is None:
+            return await self._compute_batch(seed_lists, k)
+
+        keys = [collaborative_key(seeds, k) for seeds in seed_lists]
+        results = await self.cache.get_many(keys)
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            computed = await self._compute_batch([seed_lists[i] for i in missing], k)
+            for i, recommended in zip(missing, computed):
+                results[i] = recommended
+            await self.cache.set_many({keys[i]: results[i] for i in missing})
+        return results
+
+    async def _compute_and_store(self, key: Tuple, query_uris: List[str], k: int) -> List[str]:
+        recommended = await self._compute(query_uris, k)
+        if self.cache is not None:
+            await self.cache.set(key, recommended)
+        return recommended
+
+    async def _compute(self, query_uris: List[str], k: int) -> List[str]:
+        if not self.uses_track_ids:
+            return await self._recommend(query_uris, k)
+
+        with observe_stage("dictionary", "encode"):
+            seed_ids = self.dictionary.encode(query_uris)
+        if self.cooccurrence is not None:
+            with observe_stage("matrix", "query"):
+                tracks = self.cooccurrence.top_k(seed_ids, k)
+        else:
+            tracks = await self._recommend(seed_ids.tolist(), k)
+        with observe_stage("dictionary", "decode"):
+            return self.dictionary.decode(tracks)
+
+    async def _compute_batch(self, seed_lists: List[List[str]], k: int) -> List[List[str]]:
+        if not self.uses_track_ids:
+            return await self._recommend_batch(seed_lists, k)
+
+        with observe_stage("dictionary", "encode"):
+            encoded = [self.dictionary.encode(seeds) for seeds in seed_lists]
+        if self.cooccurrence is not None:
+            with observe_stage("matrix", "query"):
+                results = [self.cooccurrence.top_k(seed_ids, k) for seed_ids in encoded]
+        else:
+            results = await self._recommend_batch([seed_ids.tolist() for seed_ids in encoded], k)
+        with observe_stage("dictionary", "decode"):
+            return [self.dictionary.decode(tracks) for tracks in results]
+
+    async def _recommend(self, seeds: List[TrackRef], k: int) -> List[TrackRef]:
+        if self.engine == "neighbors":
+            return await recommend_collaborative_neighbors(self.client, seeds, k, self.db_name)
+        return await recommend_collaborative(
+            self.client, seeds, k, self.max_neighbors, self.db_name,
+            server_side=self.engine == "aggregate")
+
+    async def _recommend_batch(self, seed_lists: List[List[TrackRef]], k: int) -> List[List[TrackRef]]:
+        results = []
+        for start in range(0, len(seed_lists), self.batch_chunk_size):
+            chunk = seed_lists[start:start + self.batch_chunk_size]
+            if self.engine == "neighbors":
+                results.extend(await recommend_collaborative_neighbors_batch(self.client, chunk, k, self.db_name))
+            else:
+                results.extend(await recommend_collaborative_batch(
+                    self.client, chunk, k, self.max_neighbors, self.db_name))
+        return results
+
+    async def warm_up(self) -> None:
+        """Connect to MongoDB ahead of the first query; the in-memory matrix needs no connection."""
+        if self.cooccurrence is None:
+            await self.client.admin.command("ping")
+            logger.info("Connected to MongoDB.")
+
+    async def close(self) -> None:
+        self.client.close()
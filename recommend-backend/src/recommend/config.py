@@ -0,0 +1,31 @@
+from typing import Literal, Optional
+
+from pydantic_settings import BaseSettings
+
+
+class Settings(BaseSettings):
+    result_cache_enabled: bool = True
+    result_cache_max_bytes: int = 64 * 1024 * 1024
+    result_cache_ttl_seconds: float = 600
+    dataset_version: str = "1"
+    shared_cache_backend: Literal["none", "redis", "sqlite"] = "none"
+    shared_cache_redis_url: str = "redis://localhost:6379/0"
+    shared_cache_sqlite_path: str = "/tmp/recommend-cache.sqlite3"
+    shared_cache_namespace: str = "recommend"
+    hybrid_mode: Literal["sequential", "concurrent"] = "sequential"
+    hybrid_budget_ms: int = 300
+    warmup_enabled: bool = True
+    warmup_names_path: Optional[str] = None
+    warmup_queries: int = 32
+    warmup_concurrency: int = 4
+    warmup_retry_seconds: float = 5
+    tracing_enabled: bool = True
+    tracing_jsonl_path: Optional[str] = None
+
+    class Config:
+        env_file = ".env"
+        env_file_encoding = "utf-8"
+        extra = "allow"
+
+
+settings = Settings()
@@ -0,0 +1,211 @@
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+import asyncpg
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.recommend.clustering.config import Settings as PostgresSettings
+from src.recommend.collaborative.config import Settings as MongoSettings
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """
+    Connection gauges and acquisition latency of one pool.
+
+    Updated from the event loop for the Postgres pools and from driver
+    threads for MongoDB, hence the lock.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.in_use = 0
+        self.waiting = 0
+        self.acquisitions = 0
+        self.failures = 0
+        self.acquire_seconds_total = 0.0
+        self.acquire_seconds_max = 0.0
+        self._lock = threading.Lock()
+
+    def acquire_started(self) -> None:
+        with self._lock:
+            self.waiting += 1
+
+    def acquired(self, seconds: float) -> None:
+        with self._lock:
+            self.waiting -= 1
+            self.in_use += 1
+            self.acquisitions += 1
+            self.acquire_seconds_total += seconds
+            self.acquire_seconds_max = max(self.acquire_seconds_max, seconds)
+
+    def acquire_failed(self) -> None:
+        with self._lock:
+            self.waiting -= 1
+            self.failures += 1
+
+    def released(self) -> None:
+        with self._lock:
+            self.in_use -= 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "in_use": self.in_use,
+                "waiting": self.waiting,
+                "acquisitions": self.acquisitions,
+                "failures": self.failures,
+                "acquire_seconds_mean": (
+                    self.acquire_seconds_total / self.acquisitions if self.acquisitions else 0.0),
+                "acquire_seconds_max": self.acquire_seconds_max,
+            }
+
+
+_pool_metrics: Dict[str, PoolMetrics] = {}
+
+
+def pool_metrics(name: str) -> PoolMetrics:
+    """Metrics of the pool called `name`, created on first use."""
+    if name not in _pool_metrics:
+        _pool_metrics[name] = PoolMetrics(name)
+    return _pool_metrics[name]
+
+
+def pool_stats() -> Dict[str, Dict[str, float]]:
+    return {name: metrics.stats() for name, metrics in _pool_metrics.items()}
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """SQLAlchemy's async queue pool, timing every checkout including the wait for a free connection."""
+
+    metrics = pool_metrics("postgres")
+
+    def _do_get(self):
+        self.metrics.acquire_started()
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except BaseException:
+            self.metrics.acquire_failed()
+            raise
+        self.metrics.acquired(time.perf_counter() - start)
+        return record
+
+    def _do_return_conn(self, record) -> None:
+        self.metrics.released()
+        super()._do_return_conn(record)
+
+
+def create_postgres_engine(url: str, settings: PostgresSettings) -> AsyncEngine:
+    """
+    Async SQLAlchemy engine with the pool sized by `postgres_pool_size` plus
+    `postgres_max_overflow` connections. Checkouts wait up to
+    `postgres_pool_timeout` seconds for a free connection, and with
+    `postgres_pool_pre_ping` each connection is pinged on checkout so
+    connections dropped by the server are replaced instead of failing a request.
+    """
+    return create_async_engine(
+        url,
+        echo=False,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.postgres_pool_size,
+        max_overflow=settings.postgres_max_overflow,
+        pool_timeout=settings.postgres_pool_timeout,
+        pool_recycle=settings.postgres_pool_recycle_seconds or -1,
+        pool_pre_ping=settings.postgres_pool_pre_ping,
+        connect_args={"prepared_statement_cache_size": settings.postgres_statement_cache_size},
+    )
+
+
+def asyncpg_pool_options(settings: PostgresSettings) -> Dict[str, int]:
+    """The same pool bounds and statement cache for the raw asyncpg pool."""
+    return {
+        "min_size": settings.postgres_pool_size,
+        "max_size": settings.postgres_pool_size + settings.postgres_max_overflow,
+        "statement_cache_size": settings.postgres_statement_cache_size,
+    }
+
+
+@asynccontextmanager
+async def acquire(pool: asyncpg.Pool, timeout: Optional[float] = None) -> AsyncIterator[asyncpg.Connection]:
+    """`pool.acquire()` recording the `asyncpg` pool metrics."""
+    metrics = pool_metrics("asyncpg")
+    metrics.acquire_started()
+    start = time.perf_counter()
+    try:
+        connection = await pool.acquire(timeout=timeout)
+    except BaseException:
+        metrics.acquire_failed()
+        raise
+    metrics.acquired(time.perf_counter() - start)
+    try:
+        yield connection
+    finally:
+        metrics.released()
+        await pool.release(connection)
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Feeds the connection checkout events of the MongoDB driver into the `mongo` pool metrics."""
+
+    def __init__(self):
+        self.metrics = pool_metrics("mongo")
+
+    def connection_check_out_started(self, event) -> None:
+        self.metrics.acquire_started()
+
+    def connection_checked_out(self, event) -> None:
+        self.metrics.acquired(event.duration)
+
+    def connection_check_out_failed(self, event) -> None:
+        self.metrics.acquire_failed()
+        logger.warning(f"MongoDB connection checkout failed after {event.duration:.3f}s: {event.reason}")
+
+    def connection_checked_in(self, event) -> None:
+        self.metrics.released()
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        logger.warning(f"MongoDB connection pool for {event.address} cleared.")
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_created(self, event) -> None:
+        pass
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        pass
+
+
+def create_mongo_client(settings: MongoSettings) -> AsyncIOMotorClient:
+    """
+    Motor client with a pool of `mongo_min_pool_size` to `mongo_max_pool_size`
+    connections per server. A checkout waits at most
+    `mongo_wait_queue_timeout_ms` for a free connection (0 waits as long as
+    the operation may take).
+    """
+    return AsyncIOMotorClient(
+        settings.mongo_uri,
+        maxPoolSize=settings.mongo_max_pool_size,
+        minPoolSize=settings.mongo_min_pool_size,
+        waitQueueTimeoutMS=settings.mongo_wait_queue_timeout_ms or None,
+        maxIdleTimeMS=settings.mongo_max_idle_time_ms or None,
+        serverSelectionTimeoutMS=settings.mongo_server_selection_timeout_ms,
+        event_listeners=[MongoPoolListener()],
+    )
@@ -0,0 +1,52 @@
+import logging
+from typing import List, Sequence, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# A track as stored in MongoDB/Postgres: a URI, or a dictionary id for
+# datasets loaded with TRACK_STORAGE=id.
+TrackRef = Union[int, str]
+
+
+class TrackDictionary:
+    """
+    Global track URI <-> int32 id mapping built by `prepare_track_dictionary.py`.
+
+    The artifact is a sorted, fixed-width byte array of URIs and a track's id
+    is its position in it, so ids are resolved with a binary search over the
+    memory-mapped array instead of a per-process dict of millions of strings.
+    """
+
+    def __init__(self, track_uris: np.ndarray):
+        self.track_uris = track_uris
+
+    @classmethod
+    def load(cls, path: str) -> "TrackDictionary":
+        dictionary = cls(np.load(path, mmap_mode="r"))
+        logger.info(f"Loaded track dictionary with {len(dictionary)} tracks from {path}.")
+        return dictionary
+
+    def __len__(self) -> int:
+        return len(self.track_uris)
+
+    def encode(self, uris: Sequence[str]) -> np.ndarray:
+        """
+        Map URIs to ids, de-duplicating and dropping unknown URIs. URIs that
+        cannot be in the fixed-width ASCII artifact (non-ASCII or longer than
+        its width) are unknown too, rather than an encoding error or a
+        truncated match.
+        """
+        width = self.track_uris.dtype.itemsize
+        known = [uri for uri in dict.fromkeys(uris) if uri.isascii() and len(uri) <= width]
+        if not known or not len(self.track_uris):
+            return np.empty(0, dtype=np.int32)
+        keys = np.asarray(known, dtype=self.track_uris.dtype)
+        positions = np.searchsorted(self.track_uris, keys)
+        positions = np.minimum(positions, len(self.track_uris) - 1)
+        return positions[self.track_uris[positions] == keys].astype(np.int32)
+
+    def decode(self, ids: Sequence[int]) -> List[str]:
+        """Map ids back to URIs, preserving order."""
+        return [uri.decode() for uri in self.track_uris[np.asarray(ids, dtype=np.int64)]]
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+from typing import List
+
+from src.recommend.clustering.service import ClusteringRecommendService
+from src.recommend.collaborative.service import CollaborativeRecommendService
+from src.recommend.metrics import observe_stage
+
+logger = logging.getLogger(__name__)
+
+
+def _result(task: asyncio.Task, backend: str) -> List[str]:
+    if task.exception() is not None:
+        logger.warning(f"{backend} backend failed in hybrid mode: {task.exception()!r}")
+        return []
+    return task.result()
+
+
+def _discard(task: asyncio.Task) -> None:
+    task.cancel()
+    # Retrieve the outcome so an error raised while cancelling is not reported as unhandled.
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+async def recommend_hybrid_concurrent(
+    collaborative_service: CollaborativeRecommendService,
+    clustering_service: ClusteringRecommendService,
+    playlist_name: str,
+    query_uris: List[str],
+    k: int = 10,
+    n_neighbors: int = 5,
+    budget_seconds: float = 0.3
+) -> List[str]:
+    """
+    Recommend tracks with both backends running concurrently under one deadline.
+
+    Collaborative results take precedence. If they alone fill `k`, the
+    clustering call is cancelled; otherwise clustering results are appended
+    if they arrive before the budget expires. A backend that fails or misses
+    the deadline contributes nothing, so the response may hold fewer than
+    `k` tracks. A cancelled call is not wasted: the services share in-flight
+    work and cache its result for the next request.
+
+    Args:
+        collaborative_service: Service for the seed-track recommendations.
+        clustering_service: Service for the playlist-name fallback.
+        playlist_name: Name of the query playlist.
+        query_uris: List of seed track URIs.
+        k: Max number of recommended tracks.
+        n_neighbors: Number of similar playlists for the clustering backend.
+        budget_seconds: Latency budget shared by both backends.
+
+    Returns:
+        A list of up to `k` unique recommended track URIs.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + budget_seconds
+
+    collaborative_task = asyncio.create_task(
+        collaborative_service.recommend_tracks(query_uris=query_uris, k=k))
+    clustering_task = asyncio.create_task(
+        clustering_service.recommend_tracks(playlist_name, k, n_neighbors))
+
+    done, _ = await asyncio.wait({collaborative_task}, timeout=budget_seconds)
+    if collaborative_task in done:
+        collaborative_recommendations = _result(collaborative_task, "Collaborative")
+    else:
+        logger.warning("Collaborative backend missed the hybrid latency budget.")
+        _discard(collaborative_task)
+        collaborative_recommendations = []
+
+    combined = list(dict.fromkeys(collaborative_recommendations))
+    logger.info(f"Collaborative returned {len(combined)} tracks")
+
+    if len(combined) >= k:
+        _discard(clustering_task)
+        return combined[:k]
+
+    done, _ = await asyncio.wait({clustering_task}, timeout=max(0.0, deadline - loop.time()))
+    if clustering_task in done:
+        clustering_recommendations = _result(clustering_task, "Clustering")
+    else:
+        logger.warning("Clustering backend missed the hybrid latency budget.")
+        _discard(clustering_task)
+        clustering_recommendations = []
+
+    logger.info(f"Pgvector fallback returned {len(clustering_recommendations)} tracks")
+
+    with observe_stage("hybrid", "merge"):
+        combined = list(dict.fromkeys(combined + clustering_recommendations))
+    return combined[:k]
@@ -0,0 +1,229 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry,
+                               Counter, Gauge, Histogram, generate_latest)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+
+from src.recommend.connections import pool_stats
+from src.recommend.tracing import span
+
+REQUEST_LATENCY = Histogram(
+    "recommend_request_duration_seconds",
+    "Latency of HTTP requests by route path.",
+    ["method", "endpoint", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "recommend_requests_in_flight",
+    "HTTP requests being served.",
+    ["endpoint"],
+    multiprocess_mode="livesum",
+)
+STAGE_LATENCY = Histogram(
+    "recommend_stage_duration_seconds",
+    "Latency of one stage of a recommendation, by backend (tfidf, pgvector, "
+    "qdrant, numpy, postings, centroids, mongo, matrix, dictionary, hybrid) "
+    "and stage (vectorize, query, merge, encode, decode).",
+    ["backend", "stage"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+RESULT_SIZE = Histogram(
+    "recommend_result_size",
+    "Number of tracks returned per recommendation.",
+    ["endpoint"],
+    buckets=(0, 1, 5, 10, 20, 50, 100, 200, 500),
+)
+EMPTY_RESULTS = Counter(
+    "recommend_empty_results_total",
+    "Recommendations that returned no tracks.",
+    ["endpoint"],
+)
+
+
+@contextmanager
+def observe_stage(backend: str, stage: str) -> Iterator[None]:
+    """
+    Time the enclosed block, awaits included, into `recommend_stage_duration_seconds`,
+    and record it as a span and a Server-Timing entry of the current request.
+    """
+    start = time.perf_counter()
+    try:
+        with span(f"{backend}.{stage}", stage=f"{backend}-{stage}", backend=backend):
+            yield
+    finally:
+        STAGE_LATENCY.labels(backend, stage).observe(time.perf_counter() - start)
+
+
+def observe_result(endpoint: str, tracks: List[str]) -> None:
+    RESULT_SIZE.labels(endpoint).observe(len(tracks))
+    if not tracks:
+        EMPTY_RESULTS.labels(endpoint).inc()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency and in-flight requests per route path.
+    Paths that match no route are counted as `other`, so scans of unknown
+    URLs do not create new label values.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        endpoint = scope["path"] if scope["path"] in ROUTES else "other"
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(endpoint)
+        start = time.perf_counter()
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight.dec()
+            REQUEST_LATENCY.labels(scope["method"], endpoint, str(status)).observe(time.perf_counter() - start)
+
+
+# Paths of the app's routes, filled in by `register_routes` once they are known.
+ROUTES = set()
+
+
+def register_routes(app) -> None:
+    ROUTES.update(route.path for route in app.routes)
+
+
+# Label values of `recommend_singleflight_top_coalesced` per service and scrape.
+TOP_COALESCED_KEYS = 10
+
+
+class ServicesCollector:
+    """
+    Reads the counters the services already keep (result and query vector
+    caches, request coalescing, out-of-vocabulary fallbacks, connection pools)
+    at scrape time.
+
+    Under the pre-fork server these are the values of the worker that
+    answers the scrape.
+    """
+
+    def __init__(self, services):
+        self.services = services
+
+    def collect(self):
+        hits = CounterMetricFamily("recommend_cache_hits", "Cache hits.", labels=["cache"])
+        misses = CounterMetricFamily("recommend_cache_misses", "Cache misses.", labels=["cache"])
+        hit_ratio = GaugeMetricFamily("recommend_cache_hit_ratio", "Cache hit ratio since start.", labels=["cache"])
+        for name, stats in self._cache_stats():
+            hits.add_metric([name], stats["hits"])
+            misses.add_metric([name], stats["misses"])
+            hit_ratio.add_metric([name], stats["hit_ratio"])
+            if "shared_hits" in stats:
+                shared_lookups = stats["shared_hits"] + stats["shared_misses"]
+                hits.add_metric([f"{name}_shared"], stats["shared_hits"])
+                misses.add_metric([f"{name}_shared"], stats["shared_misses"])
+                hit_ratio.add_metric(
+                    [f"{name}_shared"], stats["shared_hits"] / shared_lookups if shared_lookups else 0.0)
+        yield hits
+        yield misses
+        yield hit_ratio
+
+        yield from self._singleflight_metrics()
+
+        yield CounterMetricFamily(
+            "recommend_out_of_vocabulary", "Clustering queries served popular tracks.",
+            value=self.services.clustering.out_of_vocabulary_hits)
+
+        in_use = GaugeMetricFamily("recommend_pool_connections_in_use", "Checked-out connections.", labels=["pool"])
+        waiting = GaugeMetricFamily("recommend_pool_connections_waiting", "Checkouts waiting.", labels=["pool"])
+        acquire_mean = GaugeMetricFamily(
+            "recommend_pool_acquire_seconds_mean", "Mean connection checkout latency.", labels=["pool"])
+        acquire_max = GaugeMetricFamily(
+            "recommend_pool_acquire_seconds_max", "Max connection checkout latency.", labels=["pool"])
+        failures = CounterMetricFamily("recommend_pool_acquire_failures", "Failed checkouts.", labels=["pool"])
+        for name, stats in pool_stats().items():
+            in_use.add_metric([name], stats["in_use"])
+            waiting.add_metric([name], stats["waiting"])
+            acquire_mean.add_metric([name], stats["acquire_seconds_mean"])
+            acquire_max.add_metric([name], stats["acquire_seconds_max"])
+            failures.add_metric([name], stats["failures"])
+        yield from (in_use, waiting, acquire_mean, acquire_max, failures)
+
+    def _singleflight_metrics(self):
+        executions = CounterMetricFamily(
+            "recommend_singleflight_executions", "Computations started by a leading request.", labels=["service"])
+        coalesced = CounterMetricFamily(
+            "recommend_singleflight_coalesced", "Requests that awaited a computation in flight.", labels=["service"])
+        in_flight = GaugeMetricFamily(
+            "recommend_singleflight_in_flight", "Computations in flight.", labels=["service"])
+        top = GaugeMetricFamily(
+            "recommend_singleflight_top_coalesced",
+            f"Coalesced requests of the {TOP_COALESCED_KEYS} most coalesced recent keys.",
+            labels=["service", "key"])
+        for name in ("clustering", "collaborative"):
+            singleflight = getattr(self.services, name).singleflight
+            stats = singleflight.stats()
+            executions.add_metric([name], stats["executions"])
+            coalesced.add_metric([name], stats["coalesced"])
+            in_flight.add_metric([name], stats["in_flight"])
+            for key, count in singleflight.top_coalesced(TOP_COALESCED_KEYS):
+                top.add_metric([name, json.dumps(key, separators=(",", ":"))], count)
+        yield from (executions, coalesced, in_flight, top)
+
+    def _cache_stats(self):
+        clustering = self.services.clustering
+        for name, cache in (("clustering_results", clustering.cache),
+                            ("collaborative_results", self.services.collaborative.cache)):
+            if cache is not None:
+                stats = cache.stats()
+                if cache.shared is None:
+                    stats.pop("shared_hits")
+                yield name, stats
+        if hasattr(clustering.vectorizer, "stats"):
+            yield "query_vectors", clustering.vectorizer.stats()
+
+
+_services_collector: Optional[ServicesCollector] = None
+
+
+def register_services(services) -> None:
+    global _services_collector
+    unregister_services()
+    _services_collector = ServicesCollector(services)
+    REGISTRY.register(_services_collector)
+
+
+def unregister_services() -> None:
+    global _services_collector
+    if _services_collector is not None:
+        REGISTRY.unregister(_services_collector)
+        _services_collector = None
+
+
+def render_metrics():
+    """
+    The exposition text and its content type. With `PROMETHEUS_MULTIPROC_DIR`
+    set, as under the pre-fork server, the histograms and counters are summed
+    over all workers.
+    """
+    registry = REGISTRY
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+        if _services_collector is not None:
+            registry.register(_services_collector)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
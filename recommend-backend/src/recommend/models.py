@@ -0,0 +1,15 @@
+from typing import List
+
+from pydantic import BaseModel, Field
+
+MAX_BATCH_SEED_LISTS = 100
+
+
+class CollaborativeBatchRequest(BaseModel):
+    seed_lists: List[List[str]] = Field(
+        ..., max_length=MAX_BATCH_SEED_LISTS, description="Independent lists of seed track URIs")
+    k: int = 10
+
+
+class CollaborativeBatchResponse(BaseModel):
+    recommendations: List[List[str]]
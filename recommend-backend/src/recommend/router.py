@@ -1,22 +1,30 @@
 import logging
 from typing import List
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 from fastapi.security import HTTPAuthorizationCredentials
 
 from src.auth.service import AuthService
-from src.recommend.clustering.config import settings as clustering_settings
 from src.recommend.clustering.service import ClusteringRecommendService
-from src.recommend.collaborative.config import \
-    settings as collaborative_settings
 from src.recommend.collaborative.service import CollaborativeRecommendService
+from src.recommend.config import settings as recommend_settings
+from src.recommend.hybrid import recommend_hybrid_concurrent
+from src.recommend.metrics import observe_result, observe_stage
+from src.recommend.models import (CollaborativeBatchRequest,
+                                  CollaborativeBatchResponse)
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/recommend", tags=["recommend"])
 
-clustering_service = ClusteringRecommendService(clustering_settings)
-collaborative_service = CollaborativeRecommendService(collaborative_settings)
+
+# The services are built by the app lifespan (see src/main.py) and stored on `app.state`.
+def get_clustering_service(request: Request) -> ClusteringRecommendService:
+    return request.app.state.services.clustering
+
+
+def get_collaborative_service(request: Request) -> CollaborativeRecommendService:
+    return request.app.state.services.collaborative
 
 
 @router.get("/recommend-clustering", response_model=List[str])
@@ -24,12 +32,15 @@ async def recommend_tracks_clustering(
     credentials: HTTPAuthorizationCredentials = Depends(AuthService.get_api_key),
     playlist_name: str = Query(..., description="Playlist name to base recommendations on"),
     k: int = 10,
-    n_neighbors: int = 5,
+    n_neighbors: int = Query(5, ge=1, description="Number of nearest playlists to draw tracks from"),
+    clustering_service: ClusteringRecommendService = Depends(get_clustering_service),
 ):
     """
     Recommend tracks for a given playlist name.
     """
-    return await clustering_service.recommend_tracks(playlist_name, k, n_neighbors)
+    recommendations = await clustering_service.recommend_tracks(playlist_name, k, n_neighbors)
+    observe_result("clustering", recommendations)
+    return recommendations
 
 
 @router.get("/recommend-collaborative", response_model=List[str])
@@ -37,11 +48,30 @@ async def recommend_tracks_collaborative(
     credentials: HTTPAuthorizationCredentials = Depends(AuthService.get_api_key),
     query_uris: List[str] = Query(..., description="List of seed track URIs"),
     k: int = 10,
+    collaborative_service: CollaborativeRecommendService = Depends(get_collaborative_service),
 ):
     """
     Recommend tracks for a given playlist name.
     """
-    return await collaborative_service.recommend_tracks(query_uris=query_uris, k=k)
+    recommendations = await collaborative_service.recommend_tracks(query_uris=query_uris, k=k)
+    observe_result("collaborative", recommendations)
+    return recommendations
+
+
+@router.post("/recommend-collaborative/batch", response_model=CollaborativeBatchResponse)
+async def recommend_tracks_collaborative_batch(
+    request: CollaborativeBatchRequest,
+    credentials: HTTPAuthorizationCredentials = Depends(AuthService.get_api_key),
+    collaborative_service: CollaborativeRecommendService = Depends(get_collaborative_service),
+):
+    """
+    Recommend tracks for up to 100 independent seed lists, with one backend query per chunk of lists.
+    """
+    recommendations = await collaborative_service.recommend_tracks_batch(
+        seed_lists=request.seed_lists, k=request.k)
+    for tracks in recommendations:
+        observe_result("collaborative_batch", tracks)
+    return CollaborativeBatchResponse(recommendations=recommendations)
 
 
 @router.get("/recommend-hybrid", response_model=List[str])
@@ -50,12 +80,38 @@ async def recommend_tracks_hybrid(
     playlist_name: str = Query(..., description="Playlist name to base recommendations on"),
     query_uris: List[str] = Query(..., description="List of seed track URIs"),
     k: int = 10,
-    n_neighbors: int = 5,
+    n_neighbors: int = Query(5, ge=1, description="Number of nearest playlists to draw tracks from"),
+    clustering_service: ClusteringRecommendService = Depends(get_clustering_service),
+    collaborative_service: CollaborativeRecommendService = Depends(get_collaborative_service),
 ):
     """
     Recommend tracks using a hybrid approach combining clustering and collaborative filtering.
     """
-
+    if recommend_settings.hybrid_mode == "concurrent":
+        recommendations = await recommend_hybrid_concurrent(
+            collaborative_service,
+            clustering_service,
+            playlist_name=playlist_name,
+            query_uris=query_uris,
+            k=k,
+            n_neighbors=n_neighbors,
+            budget_seconds=recommend_settings.hybrid_budget_ms / 1000,
+        )
+    else:
+        recommendations = await _recommend_hybrid_sequential(
+            clustering_service, collaborative_service, playlist_name, query_uris, k, n_neighbors)
+    observe_result("hybrid", recommendations)
+    return recommendations
+
+
+async def _recommend_hybrid_sequential(
+    clustering_service: ClusteringRecommendService,
+    collaborative_service: CollaborativeRecommendService,
+    playlist_name: str,
+    query_uris: List[str],
+    k: int,
+    n_neighbors: int
+) -> List[str]:
     collaborative_recommendations = await collaborative_service.recommend_tracks(query_uris=query_uris, k=k)
 
     logger.info(
@@ -71,10 +127,11 @@ async def recommend_tracks_hybrid(
     logger.info(
         f"Pgvector fallback returned {len(clustering_recommendations)} tracks")
 
-    combined = list(
-        dict.fromkeys(
-            collaborative_recommendations +
-            clustering_recommendations))
+    with observe_stage("hybrid", "merge"):
+        combined = list(
+            dict.fromkeys(
+                collaborative_recommendations +
+                clustering_recommendations))
 
     print(f"Combined recommendations: {combined}")
     logger.info(
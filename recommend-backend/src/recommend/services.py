@@ -0,0 +1,116 @@
+import asyncio
+import json
+import logging
+import time
+from typing import List, Optional
+
+from src.recommend.cache import ResultCache, TieredCache
+from src.recommend.clustering.config import Settings as ClusteringSettings
+from src.recommend.clustering.service import ClusteringRecommendService
+from src.recommend.collaborative.config import \
+    Settings as CollaborativeSettings
+from src.recommend.collaborative.service import CollaborativeRecommendService
+from src.recommend.config import Settings
+from src.recommend.shared_cache import build_shared_cache
+
+logger = logging.getLogger(__name__)
+
+# Frequent playlist names, used when no warm-up names file is configured.
+DEFAULT_WARMUP_NAMES = [
+    "chill", "workout", "party", "country", "rock", "rap", "throwback", "summer",
+    "christmas", "oldies", "worship", "sleep", "love", "road trip", "gym", "jams",
+]
+# Seed tracks taken from each clustering result for the collaborative warm-up query.
+WARMUP_SEEDS = 5
+
+
+class RecommendServices:
+    """
+    The recommendation services of one process, built and torn down by the app lifespan.
+
+    Construction loads the artifacts. `warm_up` then opens the backend
+    connection pools and runs representative queries, so that pooled
+    connections, prepared statements and the query vector and result caches
+    are filled before `ready` turns true.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        clustering_settings: ClusteringSettings,
+        collaborative_settings: CollaborativeSettings
+    ):
+        self.settings = settings
+        self.shared_cache = build_shared_cache(settings)
+        self.clustering = ClusteringRecommendService(clustering_settings, cache=self.build_result_cache())
+        self.collaborative = CollaborativeRecommendService(collaborative_settings, cache=self.build_result_cache())
+        self.ready = False
+
+    def build_result_cache(self) -> Optional[TieredCache]:
+        if not self.settings.result_cache_enabled:
+            return None
+        return TieredCache(
+            ResultCache.from_settings(self.settings),
+            shared=self.shared_cache,
+            namespace=self.settings.shared_cache_namespace,
+            version=self.settings.dataset_version,
+        )
+
+    async def warm_up(self) -> None:
+        """
+        Connect the backends, retrying until they are reachable, then run the
+        warm-up queries and mark the services ready. Failed warm-up queries are
+        logged but do not hold back readiness once the backends are connected.
+        """
+        start = time.perf_counter()
+        await self._connect()
+        await self._run_queries()
+        self.ready = True
+        logger.info(f"Services ready after {time.perf_counter() - start:.2f}s warm-up.")
+
+    async def _connect(self) -> None:
+        while True:
+            try:
+                await asyncio.gather(self.clustering.warm_up(), self.collaborative.warm_up())
+                return
+            except Exception as e:
+                logger.warning(
+                    f"Backends not reachable during warm-up: {e!r}; "
+                    f"retrying in {self.settings.warmup_retry_seconds}s.")
+                await asyncio.sleep(self.settings.warmup_retry_seconds)
+
+    async def _run_queries(self) -> None:
+        names = self._warmup_names()
+        # Concurrent queries check out several pooled connections, preparing statements on each.
+        semaphore = asyncio.Semaphore(self.settings.warmup_concurrency)
+
+        async def run(name: str) -> None:
+            async with semaphore:
+                tracks = await self.clustering.recommend_tracks(name)
+                if tracks:
+                    await self.collaborative.recommend_tracks(tracks[:WARMUP_SEEDS])
+
+        results = await asyncio.gather(*(run(name) for name in names), return_exceptions=True)
+        failures = [result for result in results if isinstance(result, Exception)]
+        if failures:
+            logger.warning(f"{len(failures)} of {len(names)} warm-up queries failed, first: {failures[0]!r}")
+        logger.info(f"Ran {len(names)} warm-up queries.")
+
+    def _warmup_names(self) -> List[str]:
+        names = DEFAULT_WARMUP_NAMES
+        if self.settings.warmup_names_path:
+            try:
+                with open(self.settings.warmup_names_path) as f:
+                    names = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(
+                    f"Could not read warm-up names from '{self.settings.warmup_names_path}': {e!r}; "
+                    "using the default names.")
+        return names[:self.settings.warmup_queries]
+
+    async def close(self) -> None:
+        self.ready = False
+        await self.clustering.close()
+        await self.collaborative.close()
+        if self.shared_cache is not None:
+            await self.shared_cache.close()
@@ -0,0 +1,126 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Hashable, List, Optional, Sequence
+
+from src.recommend.config import Settings
+
+logger = logging.getLogger(__name__)
+
+
+def shared_key(namespace: str, version: str, key: Hashable) -> str:
+    """
+    Serialize an in-process cache key for the shared tier.
+
+    The dataset version is part of the key, so bumping it makes every entry
+    written for the previous dataset unreachable until it expires.
+    """
+    digest = hashlib.sha1(json.dumps(key, separators=(",", ":")).encode()).hexdigest()
+    return f"{namespace}:{version}:{key[0]}:{digest}"
+
+
+class SharedCacheBackend(ABC):
+    """A cache tier shared by all workers, addressed by `shared_key` strings."""
+
+    @abstractmethod
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[List[str]]]:
+        ...
+
+    @abstractmethod
+    async def set_many(self, items: Dict[str, List[str]], ttl_seconds: float) -> None:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisCacheBackend(SharedCacheBackend):
+    """Shared tier for multi-host deployments, on any Redis-protocol server."""
+
+    def __init__(self, url: str):
+        from redis.asyncio import Redis
+
+        self.client = Redis.from_url(url)
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[List[str]]]:
+        values = await self.client.mget(keys)
+        return [json.loads(value) if value is not None else None for value in values]
+
+    async def set_many(self, items: Dict[str, List[str]], ttl_seconds: float) -> None:
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                pipe.set(key, json.dumps(value), px=int(ttl_seconds * 1000))
+            await pipe.execute()
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class SQLiteCacheBackend(SharedCacheBackend):
+    """
+    Shared tier for single-host deployments and local runs.
+
+    Uses an on-disk SQLite database in WAL mode with memory-mapped I/O, so
+    every worker on the host reads the same pages without an external service.
+    """
+
+    PURGE_INTERVAL_SECONDS = 60.0
+
+    def __init__(self, path: str, mmap_size: int = 256 * 1024 * 1024):
+        self.path = path
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+        self._conn.execute("PRAGMA busy_timeout=1000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)")
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[List[str]]]:
+        return await asyncio.to_thread(self._get_many, list(keys))
+
+    async def set_many(self, items: Dict[str, List[str]], ttl_seconds: float) -> None:
+        await asyncio.to_thread(self._set_many, items, ttl_seconds)
+
+    async def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _get_many(self, keys: List[str]) -> List[Optional[List[str]]]:
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, value FROM cache WHERE key IN ({placeholders}) AND expires_at > ?",
+                [*keys, time.time()],
+            ).fetchall()
+        found = {key: json.loads(value) for key, value in rows}
+        return [found.get(key) for key in keys]
+
+    def _set_many(self, items: Dict[str, List[str]], ttl_seconds: float) -> None:
+        now = time.time()
+        rows = [(key, json.dumps(value), now + ttl_seconds) for key, value in items.items()]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)", rows)
+            if now - self._last_purge > self.PURGE_INTERVAL_SECONDS:
+                self._conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+                self._last_purge = now
+            self._conn.execute("COMMIT")
+
+
+def build_shared_cache(settings: Settings) -> Optional[SharedCacheBackend]:
+    if settings.shared_cache_backend == "redis":
+        logger.info("Using Redis shared result cache.")
+        return RedisCacheBackend(settings.shared_cache_redis_url)
+    if settings.shared_cache_backend == "sqlite":
+        logger.info(f"Using SQLite shared result cache at {settings.shared_cache_sqlite_path}.")
+        return SQLiteCacheBackend(settings.shared_cache_sqlite_path)
+    return None
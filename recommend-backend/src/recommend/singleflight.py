@@ -0,0 +1,60 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, List, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical requests onto one in-flight computation.
+
+    The first caller for a key starts the computation; callers arriving while
+    it runs await the same future instead of querying the backends again.
+    The computation is shielded, so a caller that disconnects does not cancel
+    it for the others.
+    """
+
+    def __init__(self, max_tracked_keys: int = 1024):
+        self.max_tracked_keys = max_tracked_keys
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._coalesced_by_key: "OrderedDict[Hashable, int]" = OrderedDict()
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            self._track(key)
+            return await asyncio.shield(future)
+
+        self.executions += 1
+        future = asyncio.ensure_future(fn())
+        self._in_flight[key] = future
+        future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(future)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def top_coalesced(self, n: int = 10) -> List[Tuple[Hashable, int]]:
+        """Keys with the most coalesced callers among the recently coalesced keys."""
+        return sorted(self._coalesced_by_key.items(), key=lambda item: item[1], reverse=True)[:n]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": self.in_flight,
+        }
+
+    def _track(self, key: Hashable) -> None:
+        self._coalesced_by_key[key] = self._coalesced_by_key.get(key, 0) + 1
+        self._coalesced_by_key.move_to_end(key)
+        if len(self._coalesced_by_key) > self.max_tracked_keys:
+            self._coalesced_by_key.popitem(last=False)
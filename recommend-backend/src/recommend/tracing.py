@@ -0,0 +1,154 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """
+    One timed operation of a request, written as a line of a JSONL span log.
+    The field names follow the OpenTelemetry span data model, but the
+    records are not OTLP JSON: attributes are a plain mapping, the status
+    is a bare string and there is no resource/scope wrapper.
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_span_id", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(self, name: str, trace_id: str, parent_span_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent_span_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.status = "OK"
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id or "",
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": self.attributes,
+            "status": {"code": self.status},
+        }
+
+
+class Trace:
+    """The spans of one request and the summed duration of each stage, for the Server-Timing header."""
+
+    def __init__(self):
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List[Span] = []
+        self.stage_ms: Dict[str, float] = {}
+
+    def server_timing(self, total_ms: float) -> str:
+        # Stages of concurrent calls (hybrid) overlap, so they may add up to more than the total.
+        entries = [f"{name};dur={ms:.3f}" for name, ms in self.stage_ms.items()]
+        entries.append(f"total;dur={total_ms:.3f}")
+        return ", ".join(entries)
+
+
+_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+_span: ContextVar[Optional[Span]] = ContextVar("span", default=None)
+
+
+@contextmanager
+def span(name: str, stage: Optional[str] = None, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Record the enclosed block as a child of the current span. A `stage`
+    is also summed into the request's Server-Timing header under that name.
+    Outside a traced request (e.g. the startup warm-up) this does nothing.
+    """
+    trace = _trace.get()
+    if trace is None:
+        yield None
+        return
+
+    parent = _span.get()
+    current = Span(name, trace.trace_id, parent.span_id if parent else None, attributes)
+    token = _span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "ERROR"
+        current.attributes["exception.type"] = type(e).__name__
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _span.reset(token)
+        trace.spans.append(current)
+        if stage is not None:
+            trace.stage_ms[stage] = trace.stage_ms.get(stage, 0.0) + current.duration_ms
+
+
+class JsonlSpanExporter:
+    """Appends every finished request's spans to a JSONL file, one span per line, for local inspection."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", buffering=1)
+        self._lock = threading.Lock()
+        logger.info(f"Exporting request spans to {path}.")
+
+    def export(self, spans: List[Span]) -> None:
+        lines = "".join(json.dumps(s.to_dict()) + "\n" for s in spans)
+        with self._lock:
+            self._file.write(lines)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware opening a trace with a root span per HTTP request, adding
+    a `Server-Timing` header with the stage breakdown to the response and
+    handing the spans to the exporter, if any.
+    """
+
+    def __init__(self, app, exporter: Optional[JsonlSpanExporter] = None):
+        self.app = app
+        self.exporter = exporter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace()
+        trace_token = _trace.set(trace)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                # The endpoint has returned, so every stage has been recorded.
+                total_ms = (time.perf_counter() - start) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", trace.server_timing(total_ms).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            with span(f"{scope['method']} {scope['path']}", **{
+                "http.method": scope["method"],
+                "http.target": scope["path"],
+            }):
+                await self.app(scope, receive, send_with_timing)
+        finally:
+            _trace.reset(trace_token)
+            if self.exporter is not None:
+                self.exporter.export(trace.spans)
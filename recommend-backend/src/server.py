@@ -0,0 +1,143 @@
+import asyncio
+import gc
+import logging
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import time
+from typing import Dict
+
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+# A worker that exits sooner than this after starting is not restarted.
+MIN_WORKER_UPTIME_SECONDS = 5
+
+
+def worker_count() -> int:
+    """`WEB_CONCURRENCY` workers, one per CPU when unset or 0."""
+    workers = int(os.getenv("WEB_CONCURRENCY", "0"))
+    return workers if workers > 0 else os.cpu_count() or 1
+
+
+def preload_artifacts() -> None:
+    """
+    Build the services once so their read-only artifacts are loaded in the
+    parent, then drop them. The workers build their own services, with
+    their own connections and event loop, in the app lifespan and get the
+    artifacts back from `load_artifact`.
+    """
+    from src.recommend.artifacts import loaded_artifacts
+    from src.recommend.clustering.config import settings as clustering_settings
+    from src.recommend.collaborative.config import settings as collaborative_settings
+    from src.recommend.config import settings as recommend_settings
+    from src.recommend.services import RecommendServices
+
+    start = time.perf_counter()
+    services = RecommendServices(recommend_settings, clustering_settings, collaborative_settings)
+    asyncio.run(services.close())
+    logger.info(f"Preloaded {loaded_artifacts()} artifacts in {time.perf_counter() - start:.2f}s.")
+
+
+def prepare_metrics_dir() -> str:
+    """
+    Point prometheus_client at an empty `PROMETHEUS_MULTIPROC_DIR`, a fresh
+    temporary one unless set, so /metrics sums the counters of all workers.
+    Must run before the metrics are first imported.
+    """
+    path = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="recommend-metrics-"))
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    return path
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(config: uvicorn.Config, sock: socket.socket) -> None:
+    # Objects frozen by the parent stay out of the collector, so collections
+    # in the worker never write to (and so never copy) the shared pages.
+    gc.enable()
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve(host: str, port: int, workers: int) -> None:
+    """
+    Pre-fork production server.
+
+    The parent loads the app and its artifacts, moves every object it made
+    into the permanent generation with `gc.freeze()` and forks `workers`
+    uvicorn workers that accept on one shared listening socket. Pages holding
+    the vectorizer, dictionary and indexes are shared copy-on-write instead of
+    being loaded once per worker; see `scripts/report_worker_memory.py`.
+    Crashed workers are restarted; SIGTERM or SIGINT stops them all.
+    """
+    prepare_metrics_dir()
+    from prometheus_client import multiprocess
+
+    # No collection may run before the fork: it would leave holes that the
+    # workers' allocations then fill, dirtying the shared pages.
+    gc.disable()
+    preload_artifacts()
+    config = uvicorn.Config("src.main:app", log_level="info")
+    config.load()
+    sock = bind_socket(host, port)
+    gc.freeze()
+
+    children: Dict[int, float] = {}
+    stopping = False
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(config, sock)
+            finally:
+                os._exit(0)
+        children[pid] = time.monotonic()
+        logger.info(f"Started worker {pid}.")
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    logger.info(f"Serving on http://{host}:{port} with {workers} workers (parent {os.getpid()}).")
+    for _ in range(workers):
+        spawn()
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = children.pop(pid, None)
+        if started is None:
+            continue
+        # Drops the worker's live gauges (in-flight requests) from the sums.
+        multiprocess.mark_process_dead(pid)
+        if stopping:
+            continue
+        uptime = time.monotonic() - started
+        logger.warning(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)} after {uptime:.0f}s.")
+        if uptime >= MIN_WORKER_UPTIME_SECONDS:
+            spawn()
+        else:
+            logger.error(f"Not restarting worker {pid}: it exited during startup.")
+    sock.close()
+    logger.info("All workers stopped.")
@@ -0,0 +1,15 @@
+import os
+
+# The settings modules need these at import time; the tests never connect to the services.
+for name, value in {
+    "API_KEY": "test",
+    "MONGO_URI": "mongodb://localhost:27017",
+    "MONGO_DB_NAME": "spotify",
+    "TOKENIZER_PATH": "artifacts/vectorizer.pkl",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PORT": "5432",
+    "POSTGRES_USER": "postgres",
+    "POSTGRES_PASSWORD": "postgres",
+    "POSTGRES_DB": "test",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,116 @@
+"""
+In-memory stand-in for the few Motor calls the collaborative module makes.
+
+Supports `find` and `aggregate` with `$match` on `$in`, `$limit`, `$project`
+and `$facet`, and, like the server, rejects any returned document larger
+than the 16 MiB BSON limit.
+"""
+from typing import Any, Dict, List, Optional
+
+import bson
+from pymongo.errors import DocumentTooLarge
+
+MAX_BSON_SIZE = 16 * 1024 * 1024
+
+
+def _matches(doc: Dict, query: Dict) -> bool:
+    for field, condition in query.items():
+        values = doc[field] if isinstance(doc[field], list) else [doc[field]]
+        if not set(values) & set(condition["$in"]):
+            return False
+    return True
+
+
+def _project(doc: Dict, projection: Optional[Dict]) -> Dict:
+    if projection is None:
+        return dict(doc)
+    projected = {field: doc[field] for field, keep in projection.items() if keep and field in doc}
+    if projection.get("_id", 1) and "_id" in doc:
+        projected["_id"] = doc["_id"]
+    return projected
+
+
+def _checked(doc: Dict) -> Dict:
+    if len(bson.encode(doc)) > MAX_BSON_SIZE:
+        raise DocumentTooLarge("BSONObjectTooLarge: result document exceeds 16 MiB")
+    return doc
+
+
+def _run_pipeline(docs: List[Dict], pipeline: List[Dict]) -> List[Dict]:
+    for stage in pipeline:
+        (operator, argument), = stage.items()
+        if operator == "$match":
+            docs = [doc for doc in docs if _matches(doc, argument)]
+        elif operator == "$limit":
+            docs = docs[:argument]
+        elif operator == "$project":
+            docs = [_project(doc, argument) for doc in docs]
+        elif operator == "$facet":
+            docs = [{name: _run_pipeline(docs, branch) for name, branch in argument.items()}]
+        else:
+            raise NotImplementedError(operator)
+    return docs
+
+
+class FakeCursor:
+    def __init__(self, docs: List[Dict]):
+        self._docs = docs
+        self._limit = 0
+        self._position = 0
+        self.closed = False
+
+    def limit(self, n: int) -> "FakeCursor":
+        self._limit = n
+        return self
+
+    def _remaining(self) -> List[Dict]:
+        return self._docs[:self._limit] if self._limit else self._docs
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Dict:
+        docs = self._remaining()
+        if self.closed or self._position >= len(docs):
+            raise StopAsyncIteration
+        self._position += 1
+        return _checked(docs[self._position - 1])
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict]:
+        return [doc async for doc in self]
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs: List[Dict] = []
+
+    async def insert_many(self, docs: List[Dict]) -> None:
+        self.docs.extend(dict(doc) for doc in docs)
+
+    def find(self, query: Dict, projection: Optional[Dict] = None) -> FakeCursor:
+        return FakeCursor([_project(doc, projection) for doc in self.docs if _matches(doc, query)])
+
+    def aggregate(self, pipeline: List[Dict]) -> FakeCursor:
+        return FakeCursor(_run_pipeline(self.docs, pipeline))
+
+
+class FakeDatabase:
+    def __init__(self):
+        self._collections: Dict[str, FakeCollection] = {}
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        return self[name]
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        return self._collections.setdefault(name, FakeCollection())
+
+
+class FakeMongoClient:
+    def __init__(self):
+        self._databases: Dict[str, FakeDatabase] = {}
+
+    def __getitem__(self, name: str) -> Any:
+        return self._databases.setdefault(name, FakeDatabase())
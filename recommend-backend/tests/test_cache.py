@@ -0,0 +1,155 @@
+import asyncio
+
+import pytest
+
+from src.recommend import cache as cache_module
+from src.recommend import shared_cache as shared_cache_module
+from src.recommend.cache import ResultCache, TieredCache, clustering_key, collaborative_key
+from src.recommend.shared_cache import SQLiteCacheBackend
+
+
+class Clock:
+    """Stands in for `time.monotonic` and `time.time` so TTLs expire without sleeping."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    monkeypatch.setattr(shared_cache_module.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def sqlite_path(tmp_path):
+    return str(tmp_path / "cache.sqlite3")
+
+
+def tiered(path: str, version: str = "1") -> TieredCache:
+    local = ResultCache(max_bytes=1024 * 1024, ttl_seconds=60)
+    return TieredCache(local, SQLiteCacheBackend(path), version=version)
+
+
+def test_result_cache_get_set():
+    cache = ResultCache(max_bytes=1024 * 1024, ttl_seconds=60)
+    key = collaborative_key(["b", "a"], 10)
+
+    assert cache.get(key) is None
+    cache.set(key, ["c", "d"])
+
+    assert cache.get(key) == ["c", "d"]
+    assert cache.get(collaborative_key(["a", "b", "a"], 10)) == ["c", "d"]
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_result_cache_ttl_expiry(clock):
+    cache = ResultCache(max_bytes=1024 * 1024, ttl_seconds=60)
+    key = clustering_key("Road Trip", 10, 5)
+    cache.set(key, ["a"])
+
+    clock.now += 59
+    assert cache.get(key) == ["a"]
+    clock.now += 1
+    assert cache.get(key) is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_result_cache_evicts_least_recently_used():
+    value = ["spotify:track:x"]
+    entry_size = cache_module.estimate_size(clustering_key("a", 10, 5), value)
+    cache = ResultCache(max_bytes=entry_size * 2, ttl_seconds=60)
+    first, second, third = (clustering_key(name, 10, 5) for name in "abc")
+
+    cache.set(first, value)
+    cache.set(second, value)
+    cache.get(first)
+    cache.set(third, value)
+
+    assert cache.get(second) is None
+    assert cache.get(first) == value
+    assert cache.get(third) == value
+    assert cache.stats()["evictions"] == 1
+    assert cache.size_bytes <= cache.max_bytes
+
+
+def test_result_cache_skips_values_over_budget():
+    cache = ResultCache(max_bytes=64, ttl_seconds=60)
+    key = clustering_key("a", 10, 5)
+    cache.set(key, ["spotify:track:x"] * 10)
+
+    assert cache.get(key) is None
+    assert cache.size_bytes == 0
+
+
+def test_sqlite_backend_get_set_and_ttl_expiry(sqlite_path, clock):
+    backend = SQLiteCacheBackend(sqlite_path)
+
+    async def run():
+        await backend.set_many({"k1": ["a", "b"], "k2": []}, ttl_seconds=60)
+        assert await backend.get_many(["k1", "k2", "k3"]) == [["a", "b"], [], None]
+        clock.now += 60
+        assert await backend.get_many(["k1", "k2"]) == [None, None]
+        await backend.close()
+
+    asyncio.run(run())
+
+
+def test_tiered_cache_shares_entries_through_one_sqlite_file(sqlite_path):
+    async def run():
+        writer, reader = tiered(sqlite_path), tiered(sqlite_path)
+        key = collaborative_key(["a", "b"], 10)
+
+        await writer.set(key, ["c", "d"])
+        assert await reader.get(key) == ["c", "d"]
+        assert reader.stats()["shared_hits"] == 1
+
+        # The shared hit was copied into the reader's local tier.
+        assert await reader.get(key) == ["c", "d"]
+        assert reader.stats()["shared_hits"] == 1
+        assert reader.local.stats()["hits"] == 1
+
+        assert await reader.get(collaborative_key(["a"], 10)) is None
+        assert reader.stats()["shared_misses"] == 1
+        await writer.close()
+        await reader.close()
+
+    asyncio.run(run())
+
+
+def test_tiered_cache_isolates_dataset_versions(sqlite_path):
+    async def run():
+        old, new = tiered(sqlite_path, version="1"), tiered(sqlite_path, version="2")
+        key = clustering_key("road trip", 10, 5)
+
+        await old.set(key, ["a"])
+        assert await new.get(key) is None
+        await new.set(key, ["b"])
+        assert await old.get(key) == ["a"]
+        restarted = tiered(sqlite_path, version="2")
+        assert await restarted.get(key) == ["b"]
+        for cache in (old, new, restarted):
+            await cache.close()
+
+    asyncio.run(run())
+
+
+def test_tiered_cache_treats_shared_errors_as_misses(sqlite_path):
+    async def run():
+        cache = tiered(sqlite_path)
+        await cache.shared.close()
+        key = clustering_key("a", 10, 5)
+
+        await cache.set(key, ["a"])
+        assert await cache.get(key) == ["a"]
+        assert await cache.get(clustering_key("b", 10, 5)) is None
+        assert cache.stats()["shared_errors"] == 2
+
+    asyncio.run(run())
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+from src.recommend.collaborative.recommend import recommend_collaborative, recommend_collaborative_batch
+from src.recommend.models import MAX_BATCH_SEED_LISTS, CollaborativeBatchRequest
+from tests.fake_mongo import FakeMongoClient
+
+MAX_NEIGHBORS = 50
+
+
+def track(i: int) -> str:
+    return f"spotify:track:{i:022d}"
+
+
+def playlists_client(n_lists: int, playlists_per_seed: int, tracks_per_playlist: int) -> FakeMongoClient:
+    """Playlists sharing seed `i`, each with its own filler tracks and some tracks common to all."""
+    client = FakeMongoClient()
+    docs = []
+    filler = 10_000_000
+    for seed in range(n_lists):
+        for _ in range(playlists_per_seed):
+            tracks = [track(seed), track(n_lists + seed % 7), track(n_lists + 7 + seed % 3)]
+            tracks += [track(filler + i) for i in range(tracks_per_playlist - len(tracks))]
+            filler += tracks_per_playlist
+            docs.append({"name": f"playlist {len(docs)}", "tracks": tracks})
+    asyncio.run(client["spotify"].playlists.insert_many(docs))
+    return client
+
+
+def test_batch_matches_single_list_queries():
+    client = playlists_client(n_lists=12, playlists_per_seed=60, tracks_per_playlist=20)
+    seed_lists = [[track(i)] for i in range(10)] + [[track(0), track(1)], [], [track(99_999)]]
+
+    async def run():
+        batch = await recommend_collaborative_batch(client, seed_lists, k=5, max_neighbors=MAX_NEIGHBORS)
+        single = [await recommend_collaborative(client, seeds, k=5, max_neighbors=MAX_NEIGHBORS)
+                  for seeds in seed_lists]
+        return batch, single
+
+    batch, single = asyncio.run(run())
+    assert batch == single
+    assert batch[11] == [] and batch[12] == []
+
+
+def test_full_batch_stays_under_the_document_size_limit():
+    # 100 lists x 50 playlists x 200 URIs is over 40 MiB: more than one result
+    # document may hold, so the batch must stream playlists instead.
+    client = playlists_client(n_lists=MAX_BATCH_SEED_LISTS, playlists_per_seed=MAX_NEIGHBORS, tracks_per_playlist=200)
+    seed_lists = [[track(i)] for i in range(MAX_BATCH_SEED_LISTS)]
+
+    results = asyncio.run(recommend_collaborative_batch(client, seed_lists, k=3, max_neighbors=MAX_NEIGHBORS))
+
+    assert len(results) == MAX_BATCH_SEED_LISTS
+    for i, recommended in enumerate(results):
+        assert recommended[:2] == sorted([track(MAX_BATCH_SEED_LISTS + i % 7), track(MAX_BATCH_SEED_LISTS + 7 + i % 3)])
+
+
+def test_batch_request_is_capped():
+    CollaborativeBatchRequest(seed_lists=[[track(0)]] * MAX_BATCH_SEED_LISTS)
+    with pytest.raises(ValidationError):
+        CollaborativeBatchRequest(seed_lists=[[track(0)]] * (MAX_BATCH_SEED_LISTS + 1))
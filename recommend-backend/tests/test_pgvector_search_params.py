@@ -0,0 +1,137 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from src.recommend.clustering import recommend
+
+
+class FakeResult:
+    def __init__(self, rows: List):
+        self._rows = rows
+
+    def scalars(self) -> "FakeResult":
+        return self
+
+    def all(self) -> List:
+        return self._rows
+
+
+class FakeSession:
+    """Records the SQL of every statement run in the session."""
+
+    def __init__(self, rows: List):
+        self.rows = rows
+        self.statements: List[str] = []
+
+    async def __aenter__(self) -> "FakeSession":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        pass
+
+    async def execute(self, statement, params=None) -> FakeResult:
+        self.statements.append(str(statement))
+        return FakeResult(self.rows)
+
+    async def stream_scalars(self, statement):
+        self.statements.append(str(statement))
+
+        async def rows():
+            for row in self.rows:
+                yield row
+        return rows()
+
+
+@pytest.fixture
+def session(monkeypatch):
+    session = FakeSession([["spotify:track:a"], ["spotify:track:b"]])
+    monkeypatch.setattr(recommend, "AsyncSessionLocal", lambda: session)
+    monkeypatch.setattr(recommend.settings, "pgvector_index", "hnsw")
+    return session
+
+
+@pytest.mark.parametrize("ef_search, n_neighbors, expected", [
+    (0, 5, 40),
+    (0, 50, 50),
+    (100, 50, 100),
+    (20, 30, 30),
+])
+def test_hnsw_ef_search_covers_n_neighbors(ef_search, n_neighbors, expected):
+    assert recommend.hnsw_ef_search(n_neighbors, ef_search) == expected
+
+
+def test_adaptive_stream_raises_the_default_ef_search(session):
+    async def run():
+        return [tracks async for tracks in recommend.stream_nearest_playlists([0.0], max_neighbors=50)]
+
+    assert asyncio.run(run()) == [["spotify:track:a"], ["spotify:track:b"]]
+    assert session.statements[0] == "SET LOCAL hnsw.ef_search = 50"
+
+
+def test_no_hnsw_setting_without_an_hnsw_index(session, monkeypatch):
+    monkeypatch.setattr(recommend.settings, "pgvector_index", "ivfflat")
+
+    asyncio.run(recommend.nearest_playlists([0.0], n_neighbors=50))
+
+    assert not any("hnsw.ef_search" in statement for statement in session.statements)
+
+
+def test_server_side_dedup_sets_ef_search_before_the_unnest_query(session):
+    session.rows = ["spotify:track:a", "spotify:track:b"]
+
+    tracks = asyncio.run(recommend.recommend_clustering_server_side([0.0], k=10, n_neighbors=50))
+
+    assert tracks == ["spotify:track:a", "spotify:track:b"]
+    assert session.statements[0] == "SET LOCAL hnsw.ef_search = 50"
+    assert "unnest(n.tracks)" in session.statements[1]
+
+
+class FakeTransaction:
+    async def __aenter__(self) -> None:
+        pass
+
+    async def __aexit__(self, *exc_info) -> None:
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.statements: List[tuple] = []
+
+    def transaction(self) -> FakeTransaction:
+        return FakeTransaction()
+
+    async def execute(self, sql: str, *args) -> None:
+        self.statements.append((sql, *args))
+
+    async def fetch(self, sql: str, *args) -> List[dict]:
+        self.statements.append((sql, *args))
+        return [{"track": "spotify:track:a"}]
+
+
+class FakePool:
+    def __init__(self):
+        self.connection = FakeConnection()
+
+    async def acquire(self, timeout=None) -> FakeConnection:
+        return self.connection
+
+    async def release(self, connection) -> None:
+        pass
+
+
+@pytest.mark.parametrize("pool_ef_search, n_neighbors, raised", [(0, 50, True), (0, 40, False), (100, 50, False)])
+def test_asyncpg_server_side_dedup_raises_ef_search(monkeypatch, pool_ef_search, n_neighbors, raised):
+    monkeypatch.setattr(recommend.settings, "pgvector_index", "hnsw")
+    pool = FakePool()
+
+    tracks = asyncio.run(recommend.recommend_clustering_server_side_asyncpg(
+        pool, None, k=10, n_neighbors=n_neighbors, min_ef_search=pool_ef_search))
+
+    assert tracks == ["spotify:track:a"]
+    statements = pool.connection.statements
+    if raised:
+        assert statements[0] == ("SELECT set_config('hnsw.ef_search', $1, true)", str(n_neighbors))
+    assert "unnest(n.tracks)" in statements[-1][0]
+    assert len(statements) == (2 if raised else 1)
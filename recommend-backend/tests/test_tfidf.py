@@ -0,0 +1,63 @@
+import sys
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+from sklearn.feature_extraction.text import TfidfVectorizer  # noqa: E402
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "recommender_system_experiments" / "scripts"))
+from export_tfidf_scorer import export_scorer  # noqa: E402
+
+from src.recommend.clustering.tfidf import SklearnTfidfScorer, TfidfScorer  # noqa: E402
+
+TOLERANCE = 1e-12
+
+TRAINING_NAMES = [
+    "Chill Vibes", "chill", "Road Trip", "road trip 2017", "Summer Hits", "summer vibes",
+    "Workout", "workout mix", "Rock", "rock'n'roll classics", "lo-fi hip hop", "Hip Hop",
+    "été à la plage", "Party", "party hits", "Sad songs", "Country", "throwback",
+]
+
+EDGE_CASES = [
+    "",
+    "   ",
+    "Chill Vibes",
+    "CHILL vibes chill",
+    "chill-vibes!!",
+    "the and of",
+    "rock'n'roll",
+    "summer 2017",
+    "été à la plage",
+    "Ünïcödé",
+    "🔥🔥 hits 🔥",
+    "lo-fi\thip\nhop",
+    "zzzz unknownword",
+]
+
+
+def random_names(vocabulary: List[str], n: int = 2000) -> List[str]:
+    rng = np.random.default_rng(42)
+    words = vocabulary + ["the", "a", "my", "unknownword", "2020", "Mix", "VIBES"]
+    separators = [" ", "  ", "-", ", ", " & "]
+    return [rng.choice(separators).join(rng.choice(words, size=rng.integers(1, 6))) for _ in range(n)]
+
+
+@pytest.mark.parametrize("options", [
+    {"stop_words": "english", "lowercase": True, "token_pattern": r"\b\w+\b"},
+    {"lowercase": False},
+    {"sublinear_tf": True, "norm": "l1"},
+    {"norm": None, "max_features": 10},
+])
+def test_exported_scorer_matches_sklearn(tmp_path, options):
+    vectorizer = TfidfVectorizer(**options).fit(TRAINING_NAMES)
+    export_scorer(vectorizer, tmp_path)
+    reference, scorer = SklearnTfidfScorer(vectorizer), TfidfScorer.load(tmp_path)
+
+    for name in EDGE_CASES + random_names(list(scorer.vocabulary)):
+        expected, actual = reference.transform(name), scorer.transform(name)
+        np.testing.assert_array_equal(actual.indices, expected.indices, err_msg=repr(name))
+        np.testing.assert_allclose(actual.data, expected.data, rtol=0, atol=TOLERANCE, err_msg=repr(name))
+        assert actual.dim == expected.dim
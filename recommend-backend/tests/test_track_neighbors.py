@@ -0,0 +1,46 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip("scipy")
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "recommender_system_experiments" / "scripts"))
+
+import prepare_track_neighbors  # noqa: E402
+from prepare_cooccurrence_matrix import build_playlist_matrix  # noqa: E402
+
+from src.recommend.collaborative.recommend import recommend_collaborative_neighbors  # noqa: E402
+from tests.fake_mongo import FakeMongoClient  # noqa: E402
+
+TRACK_URIS = np.array([f"spotify:track:{c * 22}".encode() for c in "abcde"])
+PLAYLISTS = [{"name": "a", "tracks": np.array([0, 1, 2])},
+             {"name": "b", "tracks": np.array([0, 1])},
+             {"name": "c", "tracks": np.array([3, 4])}]
+
+
+def neighbors_client(track_uris=None) -> FakeMongoClient:
+    """The script's neighbour documents for PLAYLISTS, loaded where the engine reads them."""
+    prepare_track_neighbors.init_worker(build_playlist_matrix(PLAYLISTS, len(TRACK_URIS)))
+    neighbors = prepare_track_neighbors.top_neighbors_for_chunk((0, len(TRACK_URIS)))
+    documents = list(prepare_track_neighbors.neighbor_documents(neighbors, track_uris))
+
+    client = FakeMongoClient()
+    asyncio.run(client["spotify"][prepare_track_neighbors.COLLECTION_NAME].insert_many(documents))
+    return client
+
+
+def test_uri_documents_answer_the_engine_query():
+    client = neighbors_client(TRACK_URIS)
+    seeds = [TRACK_URIS[0].decode()]
+
+    recommended = asyncio.run(recommend_collaborative_neighbors(client, seeds, k=3))
+
+    assert recommended == [TRACK_URIS[1].decode(), TRACK_URIS[2].decode()]
+
+
+def test_id_documents_answer_the_engine_query():
+    client = neighbors_client()
+
+    assert asyncio.run(recommend_collaborative_neighbors(client, [3], k=3)) == [4]
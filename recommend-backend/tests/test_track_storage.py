@@ -0,0 +1,64 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from src.recommend.collaborative.config import Settings as CollaborativeSettings
+from src.recommend.collaborative.service import CollaborativeRecommendService
+from tests.fake_mongo import FakeMongoClient
+
+URIS = [f"spotify:track:{c * 22}" for c in "abcde"]
+
+
+@pytest.fixture
+def dictionary_path(tmp_path):
+    path = tmp_path / "track_uris.npy"
+    np.save(path, np.array(sorted(uri.encode() for uri in URIS)))
+    return str(path)
+
+
+def collaborative_service(client: FakeMongoClient, **settings) -> CollaborativeRecommendService:
+    service = CollaborativeRecommendService(CollaborativeSettings(**settings))
+    service.client = client
+    return service
+
+
+def playlists_client(tracks):
+    client = FakeMongoClient()
+    playlists = [{"name": "a", "tracks": [tracks[0], tracks[1], tracks[2]]},
+                 {"name": "b", "tracks": [tracks[0], tracks[1]]}]
+    asyncio.run(client["spotify"].playlists.insert_many(playlists))
+    return client
+
+
+def test_uri_storage_ignores_the_dictionary(dictionary_path):
+    service = collaborative_service(
+        playlists_client(URIS), track_storage="uri", track_dictionary_path=dictionary_path)
+
+    assert service.dictionary is None
+    assert asyncio.run(service.recommend_tracks([URIS[0]], k=2)) == [URIS[1], URIS[2]]
+
+
+def test_id_storage_encodes_seeds_and_decodes_results(dictionary_path):
+    service = collaborative_service(
+        playlists_client([0, 1, 2]), track_storage="id", track_dictionary_path=dictionary_path)
+
+    assert asyncio.run(service.recommend_tracks([URIS[0]], k=2)) == [URIS[1], URIS[2]]
+
+
+@pytest.mark.parametrize("settings", [
+    {"track_storage": "id"},
+    {"track_storage": "uri", "collaborative_engine": "matrix"},
+])
+def test_track_ids_require_the_dictionary(settings):
+    with pytest.raises(ValueError, match="TRACK_DICTIONARY_PATH"):
+        CollaborativeRecommendService(CollaborativeSettings(track_dictionary_path=None, **settings))
+
+
+def test_pgvector_returns_ids_only_for_id_storage():
+    from src.recommend.clustering.backends import build_vector_search_backend
+    from src.recommend.clustering.config import Settings as ClusteringSettings
+
+    for storage, returns_ids in (("uri", False), ("id", True)):
+        settings = ClusteringSettings(vector_search_backend="pgvector", track_storage=storage)
+        assert build_vector_search_backend(settings).returns_track_ids is returns_ids
@@ -0,0 +1,50 @@
+import asyncio
+import logging
+
+from src.recommend.config import Settings
+from src.recommend.services import DEFAULT_WARMUP_NAMES, RecommendServices
+
+
+class FakeService:
+    def __init__(self, tracks=None):
+        self.tracks = tracks or []
+        self.queries = []
+
+    async def warm_up(self):
+        pass
+
+    async def recommend_tracks(self, query):
+        self.queries.append(query)
+        return self.tracks
+
+
+def services(warmup_names_path: str) -> RecommendServices:
+    services = RecommendServices.__new__(RecommendServices)
+    services.settings = Settings(warmup_names_path=warmup_names_path, warmup_queries=4)
+    services.clustering = FakeService(tracks=["spotify:track:a"])
+    services.collaborative = FakeService()
+    services.ready = False
+    return services
+
+
+def test_warm_up_falls_back_to_default_names_when_names_file_is_missing(tmp_path, caplog):
+    missing = str(tmp_path / "missing.json")
+    warm = services(missing)
+
+    with caplog.at_level(logging.ERROR, logger="src.recommend.services"):
+        asyncio.run(warm.warm_up())
+
+    assert warm.ready
+    assert warm.clustering.queries == DEFAULT_WARMUP_NAMES[:4]
+    assert missing in caplog.text
+
+
+def test_warm_up_falls_back_to_default_names_when_names_file_is_invalid(tmp_path):
+    path = tmp_path / "names.json"
+    path.write_text("not json")
+    warm = services(str(path))
+
+    asyncio.run(warm.warm_up())
+
+    assert warm.ready
+    assert warm.clustering.queries == DEFAULT_WARMUP_NAMES[:4]
@@ -0,0 +1,72 @@
+import os
+import json
+import logging
+
+import joblib
+import numpy as np
+from pathlib import Path
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# Configuration
+VECTORIZER_PATH = Path("data/03_artifacts/vectorizer.pkl")
+OUTPUT_PATH = Path("data/03_artifacts/tfidf")
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+
+def check_supported(vectorizer: TfidfVectorizer) -> None:
+    """Reject vectorizer options the backend's TfidfScorer does not reproduce."""
+    unsupported = {
+        "analyzer": (vectorizer.analyzer, "word"),
+        "ngram_range": (tuple(vectorizer.ngram_range), (1, 1)),
+        "preprocessor": (vectorizer.preprocessor, None),
+        "tokenizer": (vectorizer.tokenizer, None),
+        "strip_accents": (vectorizer.strip_accents, None),
+        "binary": (vectorizer.binary, False),
+        "use_idf": (vectorizer.use_idf, True),
+    }
+    for name, (value, expected) in unsupported.items():
+        if value != expected:
+            raise ValueError(f"Unsupported vectorizer option {name}={value!r}, expected {expected!r}")
+
+
+def export_scorer(vectorizer: TfidfVectorizer, path: Path) -> None:
+    """
+    Write the vocabulary, idf weights and tokenizer rules of a fitted vectorizer.
+
+    Stop words need not be exported: they never enter the vocabulary, and
+    with unigrams dropping them does not change any other term's count.
+    """
+    check_supported(vectorizer)
+    os.makedirs(path, exist_ok=True)
+
+    vocabulary = vectorizer.get_feature_names_out()
+    # The scorer maps a term to its position in the sorted vocabulary.
+    if list(vocabulary) != sorted(vocabulary) or any(
+        vectorizer.vocabulary_[term] != i for i, term in enumerate(vocabulary)
+    ):
+        raise ValueError("Vectorizer columns are not in sorted vocabulary order")
+
+    np.save(path / "vocabulary.npy", np.asarray(vocabulary, dtype=str))
+    np.save(path / "idf.npy", vectorizer.idf_.astype(np.float64))
+    with open(path / "tokenizer.json", "w") as f:
+        json.dump({
+            "token_pattern": vectorizer.token_pattern,
+            "lowercase": vectorizer.lowercase,
+            "sublinear_tf": vectorizer.sublinear_tf,
+            "norm": vectorizer.norm,
+        }, f, indent=2)
+    logger.info(f"Exported TF-IDF scorer with {len(vocabulary)} terms to {path}")
+
+
+def main() -> None:
+    vectorizer = joblib.load(VECTORIZER_PATH)
+    export_scorer(vectorizer, OUTPUT_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,17 @@
+import json
 import pickle
 import joblib
 import logging
 import os
+from collections import Counter
 from pathlib import Path
 from tqdm import tqdm
 from dotenv import find_dotenv, load_dotenv
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sqlalchemy import create_engine, Column, Integer, String, ARRAY
+from sqlalchemy import create_engine, text, Column, Integer, String, ARRAY
 from sqlalchemy.orm import declarative_base, sessionmaker
-from pgvector.sqlalchemy import Vector
+from pgvector import SparseVector
+from pgvector.sqlalchemy import HALFVEC, SPARSEVEC, Vector
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import dill
 import numpy
@@ -25,6 +28,9 @@ INPUT_PATH = "data/02_processed"
 VECTOR_DIM = 500
 BATCH_SIZE = 500
 NUM_WORKERS = 4  # Adjust to match your CPU or DB capabilities
+POPULAR_TRACKS_COUNT = 500
+FREQUENT_NAMES_COUNT = 10000
+DICTIONARY_PATH = "data/03_artifacts/track_uris.npy"
 
 # Load environment variables
 env_file = find_dotenv()
@@ -38,6 +44,25 @@ PG_USER = os.getenv("POSTGRES_USER", "postgres")
 PG_PASSWORD = os.getenv("POSTGRES_PASSWORD", "123456")
 PG_DB = os.getenv("POSTGRES_DB", "testdb")
 
+# Embedding column type: "vector", "halfvec" (float16) or "sparsevec".
+# The backend's PGVECTOR_STORAGE must match.
+PGVECTOR_STORAGE = os.getenv("PGVECTOR_STORAGE", "vector")
+EMBEDDING_TYPES = {"vector": Vector, "halfvec": HALFVEC, "sparsevec": SPARSEVEC}
+
+# ANN index built after the bulk load: "hnsw", "ivfflat" or "none"
+PGVECTOR_INDEX = os.getenv("PGVECTOR_INDEX", "hnsw")
+HNSW_M = int(os.getenv("PGVECTOR_HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("PGVECTOR_HNSW_EF_CONSTRUCTION", "64"))
+IVFFLAT_LISTS = int(os.getenv("PGVECTOR_IVFFLAT_LISTS", "0"))  # 0: rows / 1000
+INDEX_MAINTENANCE_WORK_MEM = os.getenv("PGVECTOR_MAINTENANCE_WORK_MEM", "1GB")
+
+# Track storage: "uri" or "id" for the dictionary ids written by
+# prepare_track_dictionary.py. The backend's TRACK_STORAGE must match, and
+# "id" needs its TRACK_DICTIONARY_PATH.
+TRACK_STORAGE = os.getenv("TRACK_STORAGE", "uri")
+TRACK_TYPES = {"uri": String, "id": Integer}
+DATASET_SUFFIX = "_ids" if TRACK_STORAGE == "id" else ""
+
 DATABASE_URL = f"postgresql://{PG_USER}:{PG_PASSWORD}@{PG_HOST}:{PG_PORT}/{PG_DB}"
 print(f"Using database URL: {DATABASE_URL}")
 # ORM setup
@@ -58,8 +83,8 @@ class Playlist(Base):
     __tablename__ = "playlists"
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
-    tracks = Column(ARRAY(String), nullable=False)
-    embedding = Column(Vector(VECTOR_DIM), nullable=False)
+    tracks = Column(ARRAY(TRACK_TYPES[TRACK_STORAGE]), nullable=False)
+    embedding = Column(EMBEDDING_TYPES[PGVECTOR_STORAGE](VECTOR_DIM), nullable=False)
 
 
 def setup_db():
@@ -72,11 +97,18 @@ def filter_valid_tracks(playlists, valid_tracks):
     logging.info(f"Filtering playlists using {len(valid_tracks)} valid tracks...")
     filtered = []
     for pl in tqdm(playlists, total=len(playlists), desc="Filtering playlists"):
-        filtered_tracks = [t for t in pl['tracks'] if t in valid_tracks]
+        filtered_tracks = [t for t in numpy.asarray(pl['tracks']).tolist() if t in valid_tracks]
         filtered.append({'name': pl['name'], 'tracks': filtered_tracks})
     logging.info(f"Filtered down to {len(filtered)} playlists.")
     return filtered
 
+def to_embedding(row):
+    # TF-IDF rows of playlist names have a handful of non-zeros; sparsevec
+    # stores only those instead of all VECTOR_DIM floats.
+    if PGVECTOR_STORAGE == "sparsevec":
+        return SparseVector(row)
+    return row.toarray().flatten().tolist()
+
 def upload_to_pgvector(main_session, name_vectors, names, tracks):
     logging.info("Uploading to pgvector in batches with multiple threads...")
 
@@ -89,7 +121,7 @@ def upload_to_pgvector(main_session, name_vectors, names, tracks):
         try:
             batch = []
             for i in range(batch_start, batch_end):
-                vector = name_vectors[i].toarray().flatten().tolist()
+                vector = to_embedding(name_vectors[i])
                 playlist = Playlist(
                     name=names[i],
                     tracks=tracks[i],
@@ -113,12 +145,84 @@ def upload_to_pgvector(main_session, name_vectors, names, tracks):
 
     logging.info("All batches uploaded.")
 
+def create_vector_index(session, index_type=PGVECTOR_INDEX):
+    """
+    Build the ANN index on the embedding column once the rows are in.
+
+    Building after the load is much faster than maintaining the index on
+    every insert, and IVFFlat needs the data to train its lists.
+    """
+    if index_type == "none":
+        logging.info("Skipping vector index creation.")
+        return
+
+    if index_type == "hnsw":
+        ddl = (
+            "CREATE INDEX playlists_embedding_hnsw_idx ON playlists "
+            f"USING hnsw (embedding {PGVECTOR_STORAGE}_l2_ops) WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})"
+        )
+    elif index_type == "ivfflat":
+        if PGVECTOR_STORAGE == "sparsevec":
+            raise ValueError("IVFFlat does not support sparsevec; use an hnsw index.")
+        rows = session.execute(text("SELECT count(*) FROM playlists")).scalar()
+        lists = IVFFLAT_LISTS or max(1, rows // 1000)
+        ddl = (
+            "CREATE INDEX playlists_embedding_ivfflat_idx ON playlists "
+            f"USING ivfflat (embedding {PGVECTOR_STORAGE}_l2_ops) WITH (lists = {lists})"
+        )
+    else:
+        raise ValueError(index_type)
+
+    logging.info(f"Creating {index_type} index: {ddl}")
+    session.execute(text(f"SET maintenance_work_mem = '{INDEX_MAINTENANCE_WORK_MEM}'"))
+    session.execute(text(ddl))
+    session.execute(text("ANALYZE playlists"))
+    session.commit()
+    logging.info("Vector index created.")
+
+def log_table_size(session):
+    table_size, index_size = session.execute(text(
+        "SELECT pg_table_size('playlists'), pg_indexes_size('playlists')"
+    )).one()
+    logging.info(
+        f"playlists ({PGVECTOR_STORAGE}): table {table_size / 2**20:.1f} MiB, "
+        f"indexes {index_size / 2**20:.1f} MiB"
+    )
+
+def save_popular_tracks(tracks, path, top_n=POPULAR_TRACKS_COUNT):
+    """
+    Save the URIs of the tracks found in the most playlists.
+
+    The backend serves this list for playlist names whose TF-IDF vector is
+    empty instead of running a meaningless nearest-neighbour query.
+    """
+    counts = Counter(t for playlist_tracks in tracks for t in set(playlist_tracks))
+    popular = [t for t, _ in counts.most_common(top_n)]
+    if TRACK_STORAGE == "id":
+        track_uris = numpy.load(DICTIONARY_PATH, mmap_mode="r")
+        popular = [track_uris[t].decode() for t in popular]
+    with open(path, "w") as f:
+        json.dump(popular, f)
+    logging.info(f"Saved {len(popular)} popular tracks to '{path}'.")
+
+def save_frequent_names(names, path, top_n=FREQUENT_NAMES_COUNT):
+    """
+    Save the most frequent normalized playlist names.
+
+    The backend vectorizes these at startup to warm its query vector cache.
+    """
+    counts = Counter(" ".join(name.split()).lower() for name in names)
+    frequent = [name for name, _ in counts.most_common(top_n)]
+    with open(path, "w") as f:
+        json.dump(frequent, f)
+    logging.info(f"Saved {len(frequent)} frequent playlist names to '{path}'.")
+
 def main():
     logging.info("Loading playlist data...")
-    with open(Path(INPUT_PATH) / "filtered_playlists_clustering.pkl", "rb") as f:
+    with open(Path(INPUT_PATH) / f"filtered_playlists_clustering{DATASET_SUFFIX}.pkl", "rb") as f:
         playlists = pickle.load(f)
 
-    with open(Path(INPUT_PATH) / "valid_tracks_clustering.pkl", "rb") as f:
+    with open(Path(INPUT_PATH) / f"valid_tracks_clustering{DATASET_SUFFIX}.pkl", "rb") as f:
         valid_tracks_dict = pickle.load(f)
 
     logging.info(f"Loaded {len(playlists)} playlists.")
@@ -150,8 +254,13 @@ def main():
     store_pkl(vectorizer, "data/03_artifacts/vectorizer.pkl", flavour="joblib")
     logging.info("Saved vectorizer to 'vectorizer.pkl'.")
 
+    save_popular_tracks(tracks, "data/03_artifacts/popular_tracks.json")
+    save_frequent_names(names, "data/03_artifacts/frequent_playlist_names.json")
+
     session = setup_db()
     upload_to_pgvector(session, name_vectors, names, tracks)
+    create_vector_index(session)
+    log_table_size(session)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,80 @@
+import os
+import pickle
+import logging
+from typing import List, Dict, Any
+
+import numpy as np
+from scipy import sparse
+from pathlib import Path
+
+# Configuration
+INPUT_PATH = Path("data/02_processed")
+DICTIONARY_PATH = Path("data/03_artifacts/track_uris.npy")
+OUTPUT_PATH = Path("data/03_artifacts/cooccurrence")
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+
+def load_pickle(path: Path) -> Any:
+    """Load a pickle file."""
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def build_playlist_matrix(playlists: List[Dict[str, Any]], n_tracks: int) -> sparse.csr_matrix:
+    """Build a binary playlist x track incidence matrix from id-encoded playlists."""
+    indptr = [0]
+    indices = []
+    for pl in playlists:
+        row = np.unique(pl['tracks'])
+        indices.append(row)
+        indptr.append(indptr[-1] + len(row))
+    indices = np.concatenate(indices).astype(np.int32) if indices else np.empty(0, dtype=np.int32)
+    data = np.ones(len(indices), dtype=np.int32)
+    matrix = sparse.csr_matrix(
+        (data, indices, np.asarray(indptr, dtype=np.int64)),
+        shape=(len(playlists), n_tracks),
+    )
+    logger.info(f"Built playlist matrix {matrix.shape} with {matrix.nnz} entries")
+    return matrix
+
+
+def build_cooccurrence(playlist_matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+    """Count, for every pair of tracks, the playlists containing both."""
+    cooccurrence = (playlist_matrix.T @ playlist_matrix).tocsr()
+    cooccurrence.setdiag(0)
+    cooccurrence.eliminate_zeros()
+    cooccurrence.sort_indices()
+    logger.info(f"Built co-occurrence matrix with {cooccurrence.nnz} entries")
+    return cooccurrence
+
+
+def save_matrix(matrix: sparse.csr_matrix, path: Path) -> None:
+    """Save the CSR arrays as .npy files so the backend can memory-map them."""
+    os.makedirs(path, exist_ok=True)
+    np.save(path / "indptr.npy", matrix.indptr.astype(np.int64))
+    np.save(path / "indices.npy", matrix.indices.astype(np.int32))
+    np.save(path / "data.npy", matrix.data.astype(np.int32))
+    logger.info(f"Saved co-occurrence matrix to {path}")
+
+
+def main() -> None:
+    logger.info("Starting co-occurrence matrix pipeline")
+
+    playlists = load_pickle(INPUT_PATH / "filtered_playlists_collaborative_ids.pkl")
+    n_tracks = len(np.load(DICTIONARY_PATH, mmap_mode="r"))
+
+    playlist_matrix = build_playlist_matrix(playlists, n_tracks)
+    cooccurrence = build_cooccurrence(playlist_matrix)
+
+    save_matrix(cooccurrence, OUTPUT_PATH)
+
+    logger.info("Pipeline complete.")
+
+
+if __name__ == "__main__":
+    main()
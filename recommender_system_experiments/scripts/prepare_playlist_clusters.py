@@ -0,0 +1,102 @@
+import os
+import logging
+from typing import List, Dict, Any
+
+import joblib
+import numpy as np
+from scipy import sparse
+from pathlib import Path
+from sklearn.cluster import MiniBatchKMeans
+
+from prepare_cooccurrence_matrix import build_playlist_matrix
+from prepare_playlist_embeddings import filter_playlists, load_pickle
+
+# Configuration
+INPUT_PATH = Path("data/02_processed")
+DICTIONARY_PATH = Path("data/03_artifacts/track_uris.npy")
+VECTORIZER_PATH = Path("data/03_artifacts/vectorizer.pkl")
+OUTPUT_PATH = Path("data/03_artifacts/playlist_clusters")
+N_CLUSTERS = int(os.getenv("N_CLUSTERS", "256"))
+BATCH_SIZE = 4096
+TOP_TRACKS = 200  # Ranked tracks kept per cluster
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+
+def fit_clusters(name_vectors: sparse.csr_matrix, n_clusters: int) -> MiniBatchKMeans:
+    """Cluster the playlist name embeddings."""
+    kmeans = MiniBatchKMeans(
+        n_clusters=n_clusters,
+        batch_size=BATCH_SIZE,
+        n_init=3,
+        random_state=42,
+    )
+    kmeans.fit(name_vectors)
+    logger.info(f"Fitted {n_clusters} clusters, inertia {kmeans.inertia_:.1f}")
+    return kmeans
+
+
+def rank_cluster_tracks(
+    labels: np.ndarray,
+    playlists: List[Dict[str, Any]],
+    n_clusters: int,
+    n_tracks: int,
+    top_n: int = TOP_TRACKS
+) -> List[np.ndarray]:
+    """
+    Rank the tracks of every cluster by the number of its playlists containing
+    them, ties broken by track id. Each list is de-duplicated by construction.
+    """
+    playlist_matrix = build_playlist_matrix(playlists, n_tracks)
+    membership = sparse.csr_matrix(
+        (np.ones(len(labels), dtype=np.int32), (labels, np.arange(len(labels)))),
+        shape=(n_clusters, len(labels)),
+    )
+    counts = (membership @ playlist_matrix).tocsr()
+
+    ranked = []
+    for cluster in range(n_clusters):
+        row = counts.getrow(cluster)
+        order = np.lexsort((row.indices, -row.data))[:top_n]
+        ranked.append(row.indices[order].astype(np.int32))
+    return ranked
+
+
+def save_clusters(kmeans: MiniBatchKMeans, ranked: List[np.ndarray], labels: np.ndarray, path: Path) -> None:
+    """Save centroids and per-cluster track lists (CSR form) as .npy files for the backend."""
+    os.makedirs(path, exist_ok=True)
+    np.save(path / "centroids.npy", np.asfortranarray(kmeans.cluster_centers_, dtype=np.float32))
+    np.save(path / "cluster_sizes.npy", np.bincount(labels, minlength=len(ranked)).astype(np.int64))
+
+    lengths = np.array([len(tracks) for tracks in ranked], dtype=np.int64)
+    np.save(path / "tracks_indptr.npy", np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64))
+    np.save(path / "tracks.npy", np.concatenate(ranked) if ranked else np.empty(0, dtype=np.int32))
+    logger.info(f"Saved {len(ranked)} clusters with {lengths.sum()} ranked tracks to {path}")
+
+
+def main() -> None:
+    logger.info("Starting playlist clustering pipeline")
+
+    playlists = load_pickle(INPUT_PATH / "filtered_playlists_clustering_ids.pkl")
+    valid_tracks = load_pickle(INPUT_PATH / "valid_tracks_clustering_ids.pkl")
+    n_tracks = len(np.load(DICTIONARY_PATH, mmap_mode="r"))
+    # Fitted by load_data_pgvector.py
+    vectorizer = joblib.load(VECTORIZER_PATH)
+
+    playlists = filter_playlists(playlists, valid_tracks)
+    name_vectors = vectorizer.transform([pl['name'] for pl in playlists])
+
+    kmeans = fit_clusters(name_vectors, N_CLUSTERS)
+    labels = kmeans.labels_
+    ranked = rank_cluster_tracks(labels, playlists, N_CLUSTERS, n_tracks)
+    save_clusters(kmeans, ranked, labels, OUTPUT_PATH)
+
+    logger.info("Pipeline complete.")
+
+
+if __name__ == "__main__":
+    main()
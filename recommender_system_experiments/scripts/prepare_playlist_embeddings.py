@@ -0,0 +1,95 @@
+import os
+import pickle
+import logging
+from typing import List, Dict, Any, Set
+
+import joblib
+import numpy as np
+from scipy import sparse
+from pathlib import Path
+
+# Configuration
+INPUT_PATH = Path("data/02_processed")
+VECTORIZER_PATH = Path("data/03_artifacts/vectorizer.pkl")
+OUTPUT_PATH = Path("data/03_artifacts/playlist_embeddings")
+MIN_PLAYLIST_LENGTH = 5
+# float16 halves the memory of the matrix at a small loss of distance precision
+EMBEDDING_DTYPE = os.getenv("EMBEDDING_DTYPE", "float32")
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+
+def load_pickle(path: Path) -> Any:
+    """Load a pickle file."""
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def filter_playlists(playlists: List[Dict[str, Any]], valid_tracks: Set[int]) -> List[Dict[str, Any]]:
+    """Apply the same track and length filters as load_data_pgvector.py."""
+    filtered = []
+    for pl in playlists:
+        tracks = [t for t in pl['tracks'].tolist() if t in valid_tracks]
+        if len(tracks) >= MIN_PLAYLIST_LENGTH:
+            filtered.append({'name': pl['name'], 'tracks': tracks})
+    logger.info(f"Retained {len(filtered)} playlists with at least {MIN_PLAYLIST_LENGTH} tracks")
+    return filtered
+
+
+def save_embeddings(name_vectors: sparse.csr_matrix, path: Path) -> None:
+    """
+    Save the dense playlist embedding matrix for the backend's `numpy` search.
+
+    The matrix is written column-major so a query can gather the columns of
+    its few non-zero terms from contiguous memory.
+    """
+    embeddings = np.asfortranarray(name_vectors.toarray(), dtype=EMBEDDING_DTYPE)
+    np.save(path / "embeddings.npy", embeddings)
+    logger.info(f"Saved {embeddings.shape} {EMBEDDING_DTYPE} embeddings to {path}")
+
+
+def save_postings(name_vectors: sparse.csr_matrix, path: Path) -> None:
+    """Save the term -> playlists inverted index with TF-IDF weights for the `postings` search."""
+    postings = name_vectors.tocsc()
+    postings.sort_indices()
+    np.save(path / "postings_indptr.npy", postings.indptr.astype(np.int64))
+    np.save(path / "postings.npy", postings.indices.astype(np.int32))
+    np.save(path / "postings_weights.npy", postings.data.astype(np.float32))
+    logger.info(f"Saved postings of {postings.shape[1]} terms with {postings.nnz} entries to {path}")
+
+
+def save_tracks(playlists: List[Dict[str, Any]], path: Path) -> None:
+    """Save the playlist track lists in CSR form, shared by both in-process searches."""
+    lengths = np.array([len(pl['tracks']) for pl in playlists], dtype=np.int64)
+    tracks_indptr = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    tracks = np.fromiter((t for pl in playlists for t in pl['tracks']), dtype=np.int32, count=int(lengths.sum()))
+    np.save(path / "tracks_indptr.npy", tracks_indptr)
+    np.save(path / "tracks.npy", tracks)
+    logger.info(f"Saved {len(tracks)} tracks of {len(playlists)} playlists to {path}")
+
+
+def main() -> None:
+    logger.info("Starting playlist embeddings pipeline")
+
+    playlists = load_pickle(INPUT_PATH / "filtered_playlists_clustering_ids.pkl")
+    valid_tracks = load_pickle(INPUT_PATH / "valid_tracks_clustering_ids.pkl")
+    # Fitted by load_data_pgvector.py
+    vectorizer = joblib.load(VECTORIZER_PATH)
+
+    playlists = filter_playlists(playlists, valid_tracks)
+    name_vectors = vectorizer.transform([pl['name'] for pl in playlists])
+
+    os.makedirs(OUTPUT_PATH, exist_ok=True)
+    save_tracks(playlists, OUTPUT_PATH)
+    save_embeddings(name_vectors, OUTPUT_PATH)
+    save_postings(name_vectors, OUTPUT_PATH)
+
+    logger.info("Pipeline complete.")
+
+
+if __name__ == "__main__":
+    main()
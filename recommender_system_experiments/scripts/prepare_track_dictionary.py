@@ -0,0 +1,92 @@
+import os
+import pickle
+import logging
+from typing import List, Dict, Any
+
+import numpy as np
+from pathlib import Path
+
+# Configuration
+INPUT_PATH = Path("data/02_processed")
+DICTIONARY_PATH = Path("data/03_artifacts/track_uris.npy")
+DATASETS = ["collaborative", "clustering"]
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+
+def load_pickle(path: Path) -> Any:
+    """Load a pickle file."""
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def save_pickle(obj: Any, path: Path) -> None:
+    """Save an object as a pickle file."""
+    try:
+        with open(path, "wb") as f:
+            pickle.dump(obj, f)
+        logger.info(f"Saved pickle to {path}")
+    except Exception as e:
+        logger.error(f"Failed to save pickle to {path}: {e}")
+
+
+def build_dictionary(track_uris: set) -> np.ndarray:
+    """
+    Sort URIs into a fixed-width byte array; a track's id is its position.
+
+    The backend resolves ids with a binary search over this array, so it can
+    be memory-mapped instead of being rebuilt as a dict in every process.
+    """
+    dictionary = np.array(sorted(uri.encode() for uri in track_uris))
+    logger.info(f"Built track dictionary with {len(dictionary)} tracks ({dictionary.dtype})")
+    return dictionary
+
+
+def load_track_ids(path: Path = DICTIONARY_PATH) -> Dict[str, int]:
+    """Load the track dictionary as a URI -> id mapping."""
+    return {uri.decode(): i for i, uri in enumerate(np.load(path).tolist())}
+
+
+def encode_playlists(playlists: List[Dict[str, Any]], track_ids: Dict[str, int]) -> List[Dict[str, Any]]:
+    """Replace each playlist's URIs with an int32 array of track ids."""
+    return [
+        {'name': pl['name'],
+         'tracks': np.array([track_ids[t] for t in pl['tracks'] if t in track_ids], dtype=np.int32)}
+        for pl in playlists
+    ]
+
+
+def main() -> None:
+    logger.info("Starting track dictionary pipeline")
+
+    valid_tracks = {
+        dataset: load_pickle(INPUT_PATH / f"valid_tracks_{dataset}.pkl")
+        for dataset in DATASETS
+    }
+    all_uris = set()
+    for tracks in valid_tracks.values():
+        all_uris.update(tracks)
+
+    dictionary = build_dictionary(all_uris)
+    os.makedirs(DICTIONARY_PATH.parent, exist_ok=True)
+    np.save(DICTIONARY_PATH, dictionary)
+    logger.info(f"Saved track dictionary to {DICTIONARY_PATH}")
+
+    track_ids = {uri.decode(): i for i, uri in enumerate(dictionary.tolist())}
+    for dataset in DATASETS:
+        playlists = load_pickle(INPUT_PATH / f"filtered_playlists_{dataset}.pkl")
+        save_pickle(encode_playlists(playlists, track_ids), INPUT_PATH / f"filtered_playlists_{dataset}_ids.pkl")
+        save_pickle(
+            {track_ids[uri]: meta for uri, meta in valid_tracks[dataset].items()},
+            INPUT_PATH / f"valid_tracks_{dataset}_ids.pkl",
+        )
+
+    logger.info("Pipeline complete.")
+
+
+if __name__ == "__main__":
+    main()